@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from core import ledger
 from core.models import Employee, Shift, Leave
 
 
@@ -18,22 +19,43 @@ class EmployeeForm(forms.ModelForm):
         fields = ['name', 'email', 'working_hours']
 
 
-class ShiftForm(forms.ModelForm):
+class VersionedModelForm(forms.ModelForm):
+    """Carries the row version the user started editing from.
+
+    Saving then fails with EditConflict if someone else saved the row in
+    between, instead of overwriting their changes.
+    """
+    version = forms.IntegerField(widget=forms.HiddenInput, required=False, min_value=1)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['version'].initial = self.instance.version
+
+    def save(self, commit=True):
+        version = self.cleaned_data.get('version')
+        if version and self.instance.pk:
+            self.instance.version = version
+        return super().save(commit)
+
+
+class ShiftForm(VersionedModelForm):
     class Meta:
         model = Shift
-        fields = ['name', 'start_time', 'end_time', 'employees']
+        fields = ['name', 'start_time', 'end_time', 'required_headcount', 'employees']
         widgets = {
             'start_time': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
             'end_time': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
         }
 
 
-class LeaveForm(forms.ModelForm):
+class LeaveForm(VersionedModelForm):
     class Meta:
         model = Leave
-        fields = ['employee', 'date', 'leave_type', 'reason']
+        fields = ['employee', 'start_date', 'end_date', 'leave_type', 'reason']
         widgets = {
-            'date': forms.DateInput(attrs={'type': 'date'}),
+            'start_date': forms.DateInput(attrs={'type': 'date'}),
+            'end_date': forms.DateInput(attrs={'type': 'date'}),
             'reason': forms.Textarea(attrs={'rows': 3}),
         }
     
@@ -41,3 +63,28 @@ class LeaveForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         # Only show active employees
         self.fields['employee'].queryset = Employee.objects.all().order_by('name')
+
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date and end_date < start_date:
+            self.add_error('end_date', 'End date cannot be before start date.')
+        else:
+            self.check_balance(cleaned_data)
+        return cleaned_data
+
+    def check_balance(self, cleaned_data):
+        """Refuse leave longer than what is left of the employee's yearly entitlement"""
+        employee = cleaned_data.get('employee')
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if not (employee and start_date and end_date):
+            return
+        try:
+            ledger.check_balance(
+                employee.pk, cleaned_data.get('leave_type'), start_date, end_date, leave=self.instance
+            )
+        except forms.ValidationError as error:
+            self.add_error(None, error)
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from admin_dashboard.reports import refresh_monthly_reports
+
+
+class Command(BaseCommand):
+    help = 'Recompute the precomputed monthly attendance and leave reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--blocking',
+            action='store_true',
+            help='Refresh without CONCURRENTLY (faster, but locks out report readers)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        refresh_monthly_reports(concurrently=not options['blocking'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Refreshed monthly reports in {elapsed:.2f}s.'))
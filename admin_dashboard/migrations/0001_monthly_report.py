@@ -0,0 +1,126 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Months are bucketed in local time so a night shift on the last day of the
+# month is reported in the month it started.
+CREATE_MONTHLY_REPORT = """
+CREATE MATERIALIZED VIEW admin_dashboard_monthlyreport AS
+WITH assignments AS (
+    SELECT a.employee_id, s.start_time, s.end_time
+    FROM core_shift_employees a
+    JOIN core_shift s ON s.id = a.shift_id
+    UNION ALL
+    SELECT a.employee_id, s.start_time, s.end_time
+    FROM core_shiftarchive_employees a
+    JOIN core_shiftarchive s ON s.id = a.shiftarchive_id
+),
+shift_totals AS (
+    SELECT employee_id,
+           date_trunc('month', start_time AT TIME ZONE %(tz)s)::date AS month,
+           count(*) AS shift_count,
+           sum(extract(epoch FROM end_time - start_time)) / 3600 AS scheduled_hours
+    FROM assignments
+    GROUP BY 1, 2
+),
+leave_totals AS (
+    SELECT l.employee_id,
+           date_trunc('month', day)::date AS month,
+           count(*) FILTER (WHERE l.status = 'approved' AND l.leave_type = 'annual') AS annual_days,
+           count(*) FILTER (WHERE l.status = 'approved' AND l.leave_type = 'sick') AS sick_days,
+           count(*) FILTER (WHERE l.status = 'approved' AND l.leave_type = 'personal') AS personal_days,
+           count(*) FILTER (WHERE l.status = 'approved' AND l.leave_type = 'other') AS other_days,
+           count(*) FILTER (WHERE l.status = 'pending') AS pending_days,
+           count(*) FILTER (WHERE l.status = 'rejected') AS rejected_days
+    FROM core_leave l
+    CROSS JOIN LATERAL generate_series(l.start_date, l.end_date, interval '1 day') AS day
+    GROUP BY 1, 2
+),
+turnaround AS (
+    SELECT employee_id,
+           date_trunc('month', created_at AT TIME ZONE %(tz)s)::date AS month,
+           count(*) AS decided_leaves,
+           avg(extract(epoch FROM approved_at - created_at)) / 3600 AS avg_turnaround_hours
+    FROM core_leave
+    WHERE approved_at IS NOT NULL
+    GROUP BY 1, 2
+),
+months AS (
+    SELECT employee_id, month FROM shift_totals
+    UNION
+    SELECT employee_id, month FROM leave_totals
+    UNION
+    SELECT employee_id, month FROM turnaround
+)
+SELECT m.employee_id,
+       m.month,
+       coalesce(s.shift_count, 0)::integer AS shift_count,
+       coalesce(s.scheduled_hours, 0)::double precision AS scheduled_hours,
+       coalesce(l.annual_days, 0)::integer AS annual_days,
+       coalesce(l.sick_days, 0)::integer AS sick_days,
+       coalesce(l.personal_days, 0)::integer AS personal_days,
+       coalesce(l.other_days, 0)::integer AS other_days,
+       coalesce(l.pending_days, 0)::integer AS pending_days,
+       coalesce(l.rejected_days, 0)::integer AS rejected_days,
+       coalesce(t.decided_leaves, 0)::integer AS decided_leaves,
+       t.avg_turnaround_hours::double precision AS avg_turnaround_hours,
+       now() AS refreshed_at
+FROM months m
+LEFT JOIN shift_totals s USING (employee_id, month)
+LEFT JOIN leave_totals l USING (employee_id, month)
+LEFT JOIN turnaround t USING (employee_id, month);
+
+-- REFRESH ... CONCURRENTLY requires a unique index covering every row.
+CREATE UNIQUE INDEX monthlyreport_employee_month_uniq
+    ON admin_dashboard_monthlyreport (employee_id, month);
+CREATE INDEX monthlyreport_month_idx ON admin_dashboard_monthlyreport (month);
+""" % {"tz": "'%s'" % settings.TIME_ZONE}
+
+DROP_MONTHLY_REPORT = "DROP MATERIALIZED VIEW IF EXISTS admin_dashboard_monthlyreport;"
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("core", "0005_punch"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_MONTHLY_REPORT, DROP_MONTHLY_REPORT),
+        migrations.CreateModel(
+            name="MonthlyReport",
+            fields=[
+                (
+                    "pk",
+                    models.CompositePrimaryKey(
+                        "employee",
+                        "month",
+                        blank=True,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("month", models.DateField()),
+                ("shift_count", models.IntegerField()),
+                ("scheduled_hours", models.FloatField()),
+                ("annual_days", models.IntegerField()),
+                ("sick_days", models.IntegerField()),
+                ("personal_days", models.IntegerField()),
+                ("other_days", models.IntegerField()),
+                ("pending_days", models.IntegerField()),
+                ("rejected_days", models.IntegerField()),
+                ("decided_leaves", models.IntegerField()),
+                ("avg_turnaround_hours", models.FloatField(null=True)),
+                ("refreshed_at", models.DateTimeField()),
+            ],
+            options={
+                "db_table": "admin_dashboard_monthlyreport",
+                "ordering": ["-month", "employee__name"],
+                "managed": False,
+            },
+        ),
+    ]
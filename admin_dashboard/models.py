@@ -1,3 +1,37 @@
 from django.db import models
 
-# Create your models here.
+from core.models import Employee
+
+
+class MonthlyReport(models.Model):
+    """Per-employee monthly summary precomputed by a materialized view.
+
+    The rows are only as fresh as the last ``refresh_reports`` run; every
+    column is computed in SQL so report pages never touch the live tables.
+    """
+    pk = models.CompositePrimaryKey('employee', 'month')
+    employee = models.ForeignKey(Employee, on_delete=models.DO_NOTHING, related_name='+')
+    month = models.DateField()
+    shift_count = models.IntegerField()
+    scheduled_hours = models.FloatField()
+    annual_days = models.IntegerField()
+    sick_days = models.IntegerField()
+    personal_days = models.IntegerField()
+    other_days = models.IntegerField()
+    pending_days = models.IntegerField()
+    rejected_days = models.IntegerField()
+    decided_leaves = models.IntegerField()
+    avg_turnaround_hours = models.FloatField(null=True)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'admin_dashboard_monthlyreport'
+        ordering = ['-month', 'employee__name']
+
+    def __str__(self):
+        return f"{self.employee} - {self.month:%Y-%m}"
+
+    @property
+    def approved_leave_days(self):
+        return self.annual_days + self.sick_days + self.personal_days + self.other_days
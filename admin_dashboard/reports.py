@@ -0,0 +1,51 @@
+import csv
+
+from django.db import connection
+
+from .models import MonthlyReport
+
+CSV_HEADER = [
+    'Employee', 'Month', 'Shifts', 'Scheduled hours',
+    'Annual leave days', 'Sick leave days', 'Personal leave days', 'Other leave days',
+    'Pending leave days', 'Rejected leave days', 'Decided leaves', 'Avg. turnaround hours',
+]
+
+
+def refresh_monthly_reports(concurrently=True):
+    """Recompute the monthly report view.
+
+    A concurrent refresh keeps the old rows readable while the new ones are
+    built; it needs the view to have been populated once, which the migration
+    that creates it already does.
+    """
+    table = connection.ops.quote_name(MonthlyReport._meta.db_table)
+    option = 'CONCURRENTLY ' if concurrently else ''
+    with connection.cursor() as cursor:
+        cursor.execute(f'REFRESH MATERIALIZED VIEW {option}{table}')
+
+
+def available_months():
+    return list(
+        MonthlyReport.objects.order_by('-month').values_list('month', flat=True).distinct()
+    )
+
+
+def write_csv(reports, stream):
+    """Write the report rows as CSV, one line per employee and month"""
+    writer = csv.writer(stream)
+    writer.writerow(CSV_HEADER)
+    for report in reports:
+        writer.writerow([
+            report.employee.name,
+            f'{report.month:%Y-%m}',
+            report.shift_count,
+            round(report.scheduled_hours, 2),
+            report.annual_days,
+            report.sick_days,
+            report.personal_days,
+            report.other_days,
+            report.pending_days,
+            report.rejected_days,
+            report.decided_leaves,
+            '' if report.avg_turnaround_hours is None else round(report.avg_turnaround_hours, 1),
+        ])
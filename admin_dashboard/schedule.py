@@ -0,0 +1,86 @@
+"""Month and week schedules of shifts and leaves on the Jalali calendar.
+
+A schedule is filled from one range query per model. Shifts overlapping the
+visible days come back in order, already tagged by the database with their
+local start day, and are filed under their day in a single pass; the days
+themselves are laid out with core.jalali.iter_days, which converts only the
+first one.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core import jalali
+from core.models import Leave, Shift
+
+SHIFT_FIELDS = ['id', 'name', 'start_time', 'end_time', 'required_headcount', 'assigned_count']
+LEAVE_FIELDS = ['id', 'employee_id', 'employee__name', 'leave_type', 'status', 'start_date', 'end_date']
+LEAVE_TYPES = dict(Leave.LEAVE_TYPE_CHOICES)
+
+
+def month_bounds(year, month):
+    """First and last day shown for a Jalali month: whole weeks, Saturday to Friday"""
+    first = jalali.to_gregorian(year, month, 1)
+    last = first + timedelta(days=jalali.month_length(year, month) - 1)
+    return first - timedelta(days=jalali.weekday(first)), last + timedelta(days=6 - jalali.weekday(last))
+
+
+def week_bounds(day):
+    """Saturday and Friday of the week containing ``day``"""
+    start = day - timedelta(days=jalali.weekday(day))
+    return start, start + timedelta(days=6)
+
+
+def schedule_days(start, end, employee=None, month=None, shifts_per_day=None):
+    """One dict per day from ``start`` to ``end``, holding its shifts and leaves.
+
+    Shifts are dicts of SHIFT_FIELDS, filed under the local day they start
+    on. With ``shifts_per_day``, each day keeps that many and counts the
+    rest in ``more``. ``month`` marks the days of that Jalali month.
+    """
+    today = timezone.localdate()
+    days = {}
+    for day, jalali_day in jalali.iter_days(start, end):
+        days[day] = {
+            'date': day,
+            'jalali': jalali_day,
+            'is_today': day == today,
+            'is_friday': jalali.weekday(day) == 6,
+            'in_month': month is None or jalali_day.month == month,
+            'shifts': [],
+            'leaves': [],
+            'more': 0,
+        }
+
+    range_start = timezone.make_aware(datetime.combine(start, time.min))
+    range_end = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+    shifts = Shift.objects.filter(start_time__lt=range_end, end_time__gt=range_start)
+    leaves = Leave.objects.overlapping(start, end).exclude(status='rejected')
+    if employee is not None:
+        shifts = shifts.filter(employees=employee)
+        leaves = leaves.filter(employee=employee)
+
+    shifts = shifts.annotate(day=TruncDate('start_time')).order_by('start_time', 'id')
+    for shift in shifts.values(*SHIFT_FIELDS, 'day'):
+        # A night shift that began before the first day shows on it
+        day = days[max(shift['day'], start)]
+        if shifts_per_day is not None and len(day['shifts']) >= shifts_per_day:
+            day['more'] += 1
+        else:
+            day['shifts'].append(shift)
+
+    for leave in leaves.order_by('start_date', 'id').values(*LEAVE_FIELDS):
+        leave['leave_type_display'] = LEAVE_TYPES.get(leave['leave_type'], leave['leave_type'])
+        first, last = max(leave['start_date'], start), min(leave['end_date'], end)
+        for offset in range((last - first).days + 1):
+            days[first + timedelta(days=offset)]['leaves'].append(leave)
+
+    return list(days.values())
+
+
+def month_weeks(year, month, employee=None, shifts_per_day=None):
+    """The month's days from :func:`schedule_days`, in rows of seven"""
+    start, end = month_bounds(year, month)
+    days = schedule_days(start, end, employee, month, shifts_per_day)
+    return [days[index:index + 7] for index in range(0, len(days), 7)]
@@ -0,0 +1,38 @@
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from core.jobqueue import register, set_progress
+
+from .models import MonthlyReport
+from .reports import refresh_monthly_reports, write_csv
+
+
+@register('refresh_reports')
+def refresh_reports(job):
+    set_progress(job, 0, 1, message='Refreshing monthly reports')
+    refresh_monthly_reports()
+    set_progress(job, 1)
+
+
+@register('export_reports')
+def export_reports(job, batch_size=2000):
+    """Write every precomputed report row to one CSV file in media storage"""
+    reports = MonthlyReport.objects.select_related('employee')
+    total = reports.count()
+    set_progress(job, 0, total)
+
+    def tracked():
+        for done, report in enumerate(reports.iterator(chunk_size=batch_size), 1):
+            if done % batch_size == 0:
+                set_progress(job, done)
+            yield report
+
+    stream = io.StringIO()
+    write_csv(tracked(), stream)
+    name = default_storage.save(
+        f'exports/shiftflow-reports-{job.pk}.csv', ContentFile(stream.getvalue().encode())
+    )
+    set_progress(job, total)
+    return {'file': name, 'rows': total}
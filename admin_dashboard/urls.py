@@ -16,10 +16,17 @@ urlpatterns = [
     
     # Shift management
     path('shifts/', views.ShiftListView.as_view(), name='shift_list'),
+    path('shifts/open/', views.OpenShiftListView.as_view(), name='open_shift_list'),
     path('shifts/create/', views.ShiftCreateView.as_view(), name='shift_create'),
     path('shifts/<int:pk>/update/', views.ShiftUpdateView.as_view(), name='shift_update'),
     path('shifts/<int:pk>/delete/', views.ShiftDeleteView.as_view(), name='shift_delete'),
     
+    # Jalali schedule
+    path('schedule/', views.schedule_month, name='schedule_month'),
+    path('schedule/<int:year>/<int:month>/', views.schedule_month, name='schedule_month'),
+    path('schedule/week/', views.schedule_week, name='schedule_week'),
+    path('schedule/week/<int:year>/<int:month>/<int:day>/', views.schedule_week, name='schedule_week'),
+
     # Leave management
     path('leaves/', views.LeaveListView.as_view(), name='leave_list'),
     path('leaves/create/', views.LeaveCreateView.as_view(), name='leave_create'),
@@ -27,4 +34,20 @@ urlpatterns = [
     path('leaves/<int:pk>/delete/', views.LeaveDeleteView.as_view(), name='leave_delete'),
     path('leaves/<int:pk>/approve/', views.leave_approve, name='leave_approve'),
     path('leaves/<int:pk>/reject/', views.leave_reject, name='leave_reject'),
+
+    # Audit trail
+    path('history/<slug:object_type>/<int:pk>/', views.ObjectHistoryView.as_view(), name='object_history'),
+
+    # Reports
+    path('reports/', views.report_list, name='report_list'),
+    path('reports/csv/', views.report_csv, name='report_csv'),
+
+    # Labor-rule compliance
+    path('compliance/', views.ComplianceViolationListView.as_view(), name='compliance_list'),
+
+    # Background jobs
+    path('jobs/', views.JobListView.as_view(), name='job_list'),
+    path('jobs/<int:pk>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:pk>/download/', views.job_download, name='job_download'),
+    path('jobs/start/<slug:name>/', views.job_start, name='job_start'),
 ]
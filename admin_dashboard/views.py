@@ -1,31 +1,108 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.contrib.auth.models import User
-from django.db import transaction
-from django.urls import reverse_lazy
+from django.db import models, transaction
+from django.urls import reverse, reverse_lazy
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.views.decorators.http import require_POST
 from .forms import EmployeeForm, ShiftForm, UserRegistrationForm, LeaveForm
-from core.models import Employee, Shift, Leave
-from django.utils import timezone
+from .models import MonthlyReport
+from .reports import available_months, write_csv
+from .schedule import month_weeks, schedule_days, week_bounds
+from core import jalali, jobqueue
+from core.audit import AUDITED_MODELS
+from core.models import AuditEntry, ComplianceViolation, EditConflict, Employee, Job, Shift, Leave
+from core.versions import get_versions
+from django.utils import formats, timezone
+from django.utils.text import capfirst
 
 
 def is_admin(user):
     """Check if user is admin (staff user)"""
     return user.is_staff
 
+
+def display_value(field, value):
+    """Text shown for a form or model field's value in an edit-conflict diff or audit history"""
+    if hasattr(value, 'all'):
+        value = value.all()
+    if isinstance(value, (list, tuple, models.QuerySet)):
+        return '، '.join(str(item) for item in value)
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        value = timezone.localtime(value)
+    choices = dict(getattr(field, 'choices', None) or ())
+    return str(choices.get(value, formats.localize(value)))
+
+
+def conflict_diff(form, current):
+    """Fields where the submitted form and the stored row now disagree"""
+    rows = []
+    for name, field in form.fields.items():
+        if name == 'version' or name not in form.cleaned_data:
+            continue
+        mine = display_value(field, form.cleaned_data[name])
+        theirs = display_value(field, getattr(current, name))
+        if mine != theirs:
+            rows.append({'label': field.label, 'mine': mine, 'theirs': theirs})
+    return rows
+
+
+class EditConflictMixin:
+    """Answer a concurrent edit with a diff instead of overwriting it.
+
+    Used with VersionedModelForm on versioned models: the save is a
+    compare-and-swap, so nothing is locked while the form is open.
+    """
+    success_message = ''
+
+    def form_valid(self, form):
+        try:
+            with transaction.atomic():
+                response = super().form_valid(form)
+        except EditConflict as conflict:
+            return self.conflict_response(form, conflict)
+        except ValidationError as error:
+            # Rechecked by the model under a lock, e.g. a leave's balance
+            form.add_error(None, error)
+            return self.form_invalid(form)
+        messages.success(self.request, self.success_message)
+        return response
+
+    def conflict_response(self, form, conflict):
+        form.add_error(None, f'{conflict} Review the differences and save again to keep your values.')
+        # Saving the form again now knowingly replaces the stored version
+        form.data = form.data.copy()
+        form.data[form.add_prefix('version')] = conflict.current.version
+        context = self.get_context_data(form=form, conflict=conflict_diff(form, conflict.current))
+        return self.render_to_response(context, status=409)
+
+
 @login_required
 @user_passes_test(is_admin)
 def dashboard(request):
     """Main admin dashboard view"""
-    total_employees = Employee.objects.count()
-    total_shifts = Shift.objects.count()
+    now = timezone.now()
+    # Counts are passed as callables and the lists as lazy querysets, so they
+    # only hit the database when their cached fragment has to re-render.
+    total_employees = Employee.objects.count
+    total_shifts = Shift.objects.count
     active_shifts = Shift.objects.filter(
-        start_time__lte=timezone.now(),
-        end_time__gte=timezone.now()
-    ).count()
-    pending_leaves = Leave.objects.filter(status='pending').count()
+        start_time__lte=now,
+        end_time__gte=now
+    ).count
+    pending_leaves = Leave.objects.filter(status='pending').count
     
     recent_employees = Employee.objects.order_by('-created_at')[:5]
     recent_shifts = Shift.objects.order_by('-created_at')[:5]
@@ -37,6 +114,8 @@ def dashboard(request):
         'pending_leaves': pending_leaves,
         'recent_employees': recent_employees,
         'recent_shifts': recent_shifts,
+        'versions': get_versions('employee', 'shift', 'leave'),
+        'fragment_timeout': settings.DASHBOARD_FRAGMENT_TIMEOUT,
     }
     return render(request, 'admin_dashboard/dashboard.html', context)
 
@@ -101,6 +180,23 @@ class ShiftListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
     def test_func(self):
         return self.request.user.is_staff
 
+    def get_queryset(self):
+        return super().get_queryset().prefetch_related('employees')
+
+
+class OpenShiftListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+    """Upcoming shifts that still need people, soonest first"""
+    template_name = 'admin_dashboard/open_shift_list.html'
+    context_object_name = 'shifts'
+    paginate_by = 20
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_queryset(self):
+        # Served from the partial shift_understaffed_idx
+        return Shift.objects.upcoming().understaffed().order_by('start_time')
+
 
 class ShiftCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     model = Shift
@@ -116,18 +212,15 @@ class ShiftCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
         return super().form_valid(form)
 
 
-class ShiftUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class ShiftUpdateView(LoginRequiredMixin, UserPassesTestMixin, EditConflictMixin, UpdateView):
     model = Shift
     form_class = ShiftForm
     template_name = 'admin_dashboard/shift_form.html'
     success_url = reverse_lazy('admin_dashboard:shift_list')
+    success_message = 'Shift updated successfully!'
     
     def test_func(self):
         return self.request.user.is_staff
-    
-    def form_valid(self, form):
-        messages.success(self.request, 'Shift updated successfully!')
-        return super().form_valid(form)
 
 
 class ShiftDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
@@ -167,18 +260,15 @@ class LeaveCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
         return super().form_valid(form)
 
 
-class LeaveUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class LeaveUpdateView(LoginRequiredMixin, UserPassesTestMixin, EditConflictMixin, UpdateView):
     model = Leave
     form_class = LeaveForm
     template_name = 'admin_dashboard/leave_form.html'
     success_url = reverse_lazy('admin_dashboard:leave_list')
+    success_message = 'Leave updated successfully!'
     
     def test_func(self):
         return self.request.user.is_staff
-    
-    def form_valid(self, form):
-        messages.success(self.request, 'Leave updated successfully!')
-        return super().form_valid(form)
 
 
 class LeaveDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
@@ -222,25 +312,303 @@ def create_employee_with_user(request):
     return render(request, 'admin_dashboard/create_employee_with_user.html', context)
 
 
+def decide_leave(request, pk, decision):
+    """Approve or reject a leave as it was when the list was rendered.
+
+    The list posts the version it showed; if the leave has been edited since,
+    nothing is saved and the current leave is shown with a 409 instead.
+    """
+    leave = get_object_or_404(Leave, pk=pk)
+    if leave.status != 'pending':
+        messages.warning(request, f'Leave cannot be {decision}d.')
+        return redirect('admin_dashboard:leave_list')
+    try:
+        # Compare-and-swap against the version the supervisor looked at
+        leave.version = int(request.POST['version'])
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest('Missing leave version.')
+    try:
+        with transaction.atomic():
+            getattr(leave, decision)(request.user)
+    except EditConflict as conflict:
+        context = {'leave': conflict.current, 'decision': decision}
+        return render(request, 'admin_dashboard/leave_conflict.html', context, status=409)
+    except ValidationError as error:
+        messages.warning(request, ' '.join(error.messages))
+        return redirect('admin_dashboard:leave_list')
+    messages.success(request, f'Leave {decision}d successfully!')
+    return redirect('admin_dashboard:leave_list')
+
+
 @login_required
 @user_passes_test(is_admin)
+@require_POST
 def leave_approve(request, pk):
     """Approve a leave"""
-    leave = get_object_or_404(Leave, pk=pk)
-    if leave.status == 'pending':
-        leave.approve(request.user)
-        messages.success(request, 'Leave approved successfully!')
-    else:
-        messages.warning(request, 'Leave cannot be approved.')
-    return redirect('admin_dashboard:leave_list')
+    return decide_leave(request, pk, 'approve')
 
 
 @login_required
 @user_passes_test(is_admin)
+@require_POST
 def leave_reject(request, pk):
     """Reject a leave"""
-    leave = get_object_or_404(Leave, pk=pk)
-    if leave.status == 'pending':
-        leave.reject(request.user)
-        messages.success(request, 'Leave rejected successfully!')
-        return redirect('admin_dashboard:leave_list')
+    return decide_leave(request, pk, 'reject')
+
+
+def selected_report_month(request, months):
+    """Month picked with ``?month=YYYY-MM``, defaulting to the latest one reported"""
+    try:
+        month = datetime.strptime(request.GET.get('month', ''), '%Y-%m').date()
+    except ValueError:
+        return months[0] if months else None
+    return month if month in months else None
+
+
+@login_required
+@user_passes_test(is_admin)
+def report_list(request):
+    """Monthly per-employee report, read from the precomputed rows only"""
+    months = available_months()
+    month = selected_report_month(request, months)
+    reports = MonthlyReport.objects.filter(month=month).select_related('employee')
+    context = {
+        'months': months,
+        'month': month,
+        'reports': reports,
+    }
+    return render(request, 'admin_dashboard/report_list.html', context)
+
+
+@login_required
+@user_passes_test(is_admin)
+def report_csv(request):
+    """CSV download of one month of the precomputed report"""
+    month = selected_report_month(request, available_months())
+    if month is None:
+        messages.warning(request, 'No report is available for that month.')
+        return redirect('admin_dashboard:report_list')
+    reports = MonthlyReport.objects.filter(month=month).select_related('employee')
+    response = HttpResponse(content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="shiftflow-report-{month:%Y-%m}.csv"'
+    write_csv(reports, response)
+    return response
+
+
+class ComplianceViolationListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+    model = ComplianceViolation
+    template_name = 'admin_dashboard/compliance_list.html'
+    context_object_name = 'violations'
+    paginate_by = 50
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('employee', 'shift')
+        rule = self.request.GET.get('rule')
+        if rule:
+            queryset = queryset.filter(rule=rule)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['rules'] = ComplianceViolation.RULE_CHOICES
+        context['rule'] = self.request.GET.get('rule', '')
+        return context
+
+
+# Shown in the history page title
+AUDITED_LABELS = {'employee': 'کارمند', 'shift': 'شیفت', 'leave': 'مرخصی'}
+
+
+def history_rows(entries, model):
+    """Entries of ``model`` with their changes as display text.
+
+    Rows referenced by the changes (employees, approvers...) are fetched
+    with one query per related model for the whole page.
+    """
+    fields = {}
+    for entry in entries:
+        for name in entry.changes:
+            if name not in fields:
+                try:
+                    fields[name] = model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    # Dropped since the entry was written
+                    fields[name] = None
+
+    wanted = defaultdict(set)
+    for entry in entries:
+        for name, values in entry.changes.items():
+            field = fields[name]
+            if field is not None and field.is_relation:
+                wanted[field.related_model].update(value for value in values if value is not None)
+    found = {related: related._default_manager.in_bulk(ids) for related, ids in wanted.items()}
+
+    def show(field, value):
+        if value is None:
+            return ''
+        if field is None:
+            return str(value)
+        if field.is_relation:
+            row = found[field.related_model].get(value)
+            return str(row) if row is not None else f'#{value}'
+        return display_value(field, field.to_python(value))
+
+    rows = []
+    for entry in entries:
+        changes = []
+        for name, values in entry.changes.items():
+            field = fields[name]
+            label = capfirst(field.verbose_name) if field is not None else name
+            if entry.action in ('assign', 'unassign'):
+                changes.append({'label': label, 'new': '، '.join(show(field, value) for value in values)})
+            else:
+                old, new = values
+                changes.append({'label': label, 'old': show(field, old), 'new': show(field, new)})
+        rows.append({'entry': entry, 'changes': changes})
+    return rows
+
+
+class ObjectHistoryView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+    """Audit trail of one employee, shift or leave, newest first"""
+    template_name = 'admin_dashboard/object_history.html'
+    context_object_name = 'entries'
+    paginate_by = 20
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_queryset(self):
+        self.audited_model = AUDITED_MODELS.get(self.kwargs['object_type'])
+        if self.audited_model is None:
+            raise Http404('Unknown object type')
+        # Read in order from audit_object_idx, newest partition first
+        return AuditEntry.objects.filter(
+            object_type=self.kwargs['object_type'], object_id=self.kwargs['pk']
+        ).select_related('actor')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        object_type = self.kwargs['object_type']
+        context['subject'] = self.audited_model.objects.filter(pk=self.kwargs['pk']).first()
+        context['subject_label'] = AUDITED_LABELS[object_type]
+        context['subject_id'] = self.kwargs['pk']
+        context['back_url'] = reverse(f'admin_dashboard:{object_type}_list')
+        context['rows'] = history_rows(context['entries'], self.audited_model)
+        return context
+
+
+def selected_employee(request):
+    """Employee chosen with ?employee=<pk> to narrow a schedule, if any"""
+    pk = request.GET.get('employee', '')
+    return Employee.objects.filter(pk=pk).first() if pk.isdigit() else None
+
+
+@login_required
+@user_passes_test(is_admin)
+def schedule_month(request, year=None, month=None):
+    """Shifts and leaves of a Jalali month, the current one by default"""
+    if year is None:
+        year, month = jalali.to_jalali(timezone.localdate())[:2]
+    try:
+        jalali.to_gregorian(year, month, 1)
+    except ValueError:
+        raise Http404('No such month')
+    employee = selected_employee(request)
+    context = {
+        'year': year,
+        'month': month,
+        'month_name': jalali.MONTH_NAMES[month - 1],
+        'previous': jalali.add_months(year, month, -1),
+        'next': jalali.add_months(year, month, 1),
+        'weekday_names': jalali.WEEKDAY_NAMES,
+        # Called only when the cached grid has to re-render
+        'weeks': partial(month_weeks, year, month, employee, settings.SCHEDULE_SHIFTS_PER_DAY),
+        'employee': employee,
+        'employees': Employee.objects.only('pk', 'name'),
+        'today': timezone.localdate(),
+        'versions': get_versions('shift', 'leave'),
+        'fragment_timeout': settings.DASHBOARD_FRAGMENT_TIMEOUT,
+    }
+    return render(request, 'admin_dashboard/schedule_month.html', context)
+
+
+@login_required
+@user_passes_test(is_admin)
+def schedule_week(request, year=None, month=None, day=None):
+    """Shifts and leaves of the Saturday-to-Friday week containing a Jalali date"""
+    if year is None:
+        selected = timezone.localdate()
+    else:
+        try:
+            selected = jalali.to_gregorian(year, month, day)
+        except ValueError:
+            raise Http404('No such day')
+    start, end = week_bounds(selected)
+    employee = selected_employee(request)
+    context = {
+        'days': schedule_days(start, end, employee),
+        'start': start,
+        'end': end,
+        'previous': jalali.to_jalali(start - timedelta(days=7)),
+        'next': jalali.to_jalali(start + timedelta(days=7)),
+        'month': jalali.to_jalali(selected),
+        'employee': employee,
+        'employees': Employee.objects.only('pk', 'name'),
+    }
+    return render(request, 'admin_dashboard/schedule_week.html', context)
+
+
+# Jobs staff may start from the dashboard, with the message shown once queued
+STARTABLE_JOBS = {
+    'refresh_reports': 'Report refresh queued.',
+    'export_reports': 'Report export queued.',
+    'archive_shifts': 'Shift archiving queued.',
+    'check_compliance': 'Compliance audit queued.',
+}
+
+
+class JobListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+    model = Job
+    template_name = 'admin_dashboard/job_list.html'
+    context_object_name = 'jobs'
+    paginate_by = 20
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('created_by')
+
+
+@login_required
+@user_passes_test(is_admin)
+def job_detail(request, pk):
+    """Status and progress of one background job"""
+    job = get_object_or_404(Job.objects.select_related('created_by'), pk=pk)
+    return render(request, 'admin_dashboard/job_detail.html', {'job': job})
+
+
+@login_required
+@user_passes_test(is_admin)
+@require_POST
+def job_start(request, name):
+    """Queue one of the dashboard jobs and show its status page"""
+    if name not in STARTABLE_JOBS:
+        raise Http404('Unknown job')
+    job = jobqueue.enqueue(name, user=request.user)
+    messages.success(request, STARTABLE_JOBS[name])
+    return redirect('admin_dashboard:job_detail', pk=job.pk)
+
+
+@login_required
+@user_passes_test(is_admin)
+def job_download(request, pk):
+    """Download the file produced by a finished job"""
+    job = get_object_or_404(Job, pk=pk, status='succeeded')
+    name = (job.result or {}).get('file')
+    if not name or not default_storage.exists(name):
+        raise Http404('This job has no file to download')
+    return FileResponse(default_storage.open(name), as_attachment=True)
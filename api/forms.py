@@ -0,0 +1,24 @@
+from django import forms
+from django.contrib.auth.models import User
+
+from admin_dashboard.forms import EmployeeForm
+
+
+class EmployeeCreateForm(EmployeeForm):
+    """Create an employee together with a login that has no usable password yet"""
+    username = forms.CharField(max_length=150)
+
+    def clean_username(self):
+        username = self.cleaned_data['username']
+        if User.objects.filter(username=username).exists():
+            raise forms.ValidationError('A user with that username already exists.', code='unique')
+        return username
+
+    def save(self, commit=True):
+        employee = super().save(commit=False)
+        employee.user = User(username=self.cleaned_data['username'], email=employee.email)
+        employee.user.set_unusable_password()
+        if commit:
+            employee.user.save()
+            employee.save()
+        return employee
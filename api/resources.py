@@ -0,0 +1,185 @@
+"""How each model is exposed by the JSON API.
+
+Reads go through ``QuerySet.values()`` so a page of thousands of rows is
+serialized from plain dicts, without building model instances. Writes are
+validated with the same ModelForms the dashboard uses.
+"""
+import base64
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.forms.models import model_to_dict
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from admin_dashboard.forms import EmployeeForm, LeaveForm, ShiftForm
+from core.models import Employee, Leave, Shift
+
+from .forms import EmployeeCreateForm
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row):
+    raw = f"{row['updated_at'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        updated_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        updated_at = parse_datetime(updated_at)
+        pk = int(pk)
+    except ValueError:
+        raise InvalidCursor('Invalid cursor.')
+    if updated_at is None:
+        raise InvalidCursor('Invalid cursor.')
+    return updated_at, pk
+
+
+class Resource:
+    model = None
+    # Readable fields, in output order
+    fields = ()
+    # Fields filled in by ``add_computed`` rather than selected with values()
+    computed = ()
+    form_class = None
+    create_form_class = None
+    # API name -> form field name for writes
+    aliases = {}
+    # Database constraint -> (API field, message) reported when a write breaks it
+    constraints = {}
+
+    def page(self, fields, updated_since=None, cursor=None, limit=100):
+        """Return one page of rows ordered by ``(updated_at, id)`` and the next cursor.
+
+        Rows changed in the last API_SYNC_LAG_SECONDS are held back until a
+        later request: one stamped earlier may still be about to commit, and
+        a client that had already moved past it would never see it.
+        """
+        settled = timezone.now() - timedelta(seconds=settings.API_SYNC_LAG_SECONDS)
+        queryset = self.model.objects.filter(updated_at__lt=settled).order_by('updated_at', 'id')
+        if updated_since is not None:
+            queryset = queryset.filter(updated_at__gte=updated_since)
+        if cursor is not None:
+            updated_at, pk = decode_cursor(cursor)
+            # The plain >= bound lets PostgreSQL walk the (updated_at, id)
+            # index and stop after one page instead of sorting the rest
+            queryset = queryset.filter(updated_at__gte=updated_at).filter(
+                Q(updated_at__gt=updated_at) | Q(id__gt=pk)
+            )
+        rows = self.rows(queryset, fields, limit=limit + 1)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1])
+        return self.project(rows, fields), next_cursor
+
+    def rows(self, queryset, fields, limit=None):
+        # id and updated_at are always selected: the cursor is built from them
+        selected = [
+            name for name in self.fields
+            if name not in self.computed and (name in fields or name in ('id', 'updated_at'))
+        ]
+        queryset = queryset.values(*selected)
+        if limit is not None:
+            queryset = queryset[:limit]
+        rows = list(queryset)
+        requested = [name for name in self.computed if name in fields]
+        if rows and requested:
+            self.add_computed(rows, requested)
+        return rows
+
+    def project(self, rows, fields):
+        if all(name in fields for name in ('id', 'updated_at')):
+            return rows
+        return [{name: row[name] for name in row if name in fields} for row in rows]
+
+    def add_computed(self, rows, names):
+        pass
+
+    def form_data(self, item, instance=None):
+        """Form data for one API item; partial updates start from the stored values"""
+        data = {}
+        if instance is not None:
+            for name, value in model_to_dict(instance, fields=self.form_class._meta.fields).items():
+                if isinstance(value, list):
+                    value = [obj.pk for obj in value]
+                data[name] = value
+        for name, value in item.items():
+            data[self.aliases.get(name, name)] = value
+        return data
+
+    def conflict_errors(self, error):
+        """Per-field errors, in the shape of form errors, for an IntegrityError.
+
+        Only the name of the broken constraint is looked at; the database's
+        message, with its SQL and key values, is not passed on.
+        """
+        diag = getattr(error.__cause__, 'diag', None)
+        field, message = self.constraints.get(
+            getattr(diag, 'constraint_name', None), ('__all__', 'Conflicts with another row.')
+        )
+        return {field: [{'message': message, 'code': 'conflict'}]}
+
+    def get_form(self, item, instance=None):
+        if instance is None:
+            form_class = self.create_form_class or self.form_class
+        else:
+            form_class = self.form_class
+        return form_class(data=self.form_data(item, instance), instance=instance)
+
+
+class EmployeeResource(Resource):
+    model = Employee
+    fields = ('id', 'user_id', 'name', 'email', 'working_hours', 'created_at', 'updated_at')
+    form_class = EmployeeForm
+    create_form_class = EmployeeCreateForm
+    constraints = {
+        'auth_user_username_key': ('username', 'A user with that username already exists.'),
+        'core_employee_email_key': ('email', 'An employee with that email already exists.'),
+    }
+
+
+class ShiftResource(Resource):
+    model = Shift
+    fields = (
+        'id', 'name', 'start_time', 'end_time', 'required_headcount', 'assigned_count',
+        'employees', 'version', 'created_at', 'updated_at',
+    )
+    computed = ('employees',)
+    form_class = ShiftForm
+
+    def add_computed(self, rows, names):
+        assigned = defaultdict(list)
+        assignments = Shift.employees.through.objects.filter(
+            shift_id__in=[row['id'] for row in rows]
+        ).order_by('shift_id', 'employee_id').values_list('shift_id', 'employee_id')
+        for shift_id, employee_id in assignments:
+            assigned[shift_id].append(employee_id)
+        for row in rows:
+            row['employees'] = assigned[row['id']]
+
+
+class LeaveResource(Resource):
+    model = Leave
+    fields = (
+        'id', 'employee_id', 'start_date', 'end_date', 'leave_type', 'status', 'reason',
+        'approved_by_id', 'approved_at', 'version', 'created_at', 'updated_at',
+    )
+    form_class = LeaveForm
+    aliases = {'employee_id': 'employee'}
+    constraints = {
+        'leave_no_overlap': ('start_date', 'Overlaps another leave of the employee.'),
+    }
+
+
+resources = {
+    'employees': EmployeeResource(),
+    'shifts': ShiftResource(),
+    'leaves': LeaveResource(),
+}
@@ -0,0 +1,106 @@
+import json
+from datetime import date, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Employee, Leave, Shift
+
+
+@override_settings(API_TOKENS=['secret'], API_SYNC_LAG_SECONDS=0)
+class ApiTestCase(TestCase):
+    def setUp(self):
+        start = (timezone.now() + timedelta(days=1)).replace(second=0, microsecond=0)
+        self.shifts = [
+            Shift.objects.create(
+                name=f'Shift {index}', start_time=start + timedelta(days=index),
+                end_time=start + timedelta(days=index, hours=8),
+            )
+            for index in range(5)
+        ]
+        user = User.objects.create_user('worker')
+        self.employee = Employee.objects.create(user=user, name='Worker', email='worker@example.com')
+
+    def get(self, resource, **params):
+        return self.client.get(
+            reverse('api:collection', args=[resource]), params, HTTP_AUTHORIZATION='Bearer secret'
+        )
+
+    def bulk(self, resource, items, method='post'):
+        return getattr(self.client, method)(
+            reverse('api:bulk', args=[resource]), json.dumps(items),
+            content_type='application/json', HTTP_AUTHORIZATION='Bearer secret',
+        )
+
+
+class CollectionTests(ApiTestCase):
+    def test_cursor_walks_every_row_once(self):
+        # Tied timestamps are ordered by id
+        Shift.objects.filter(pk__in=[shift.pk for shift in self.shifts[1:4]]).update(
+            updated_at=self.shifts[1].updated_at
+        )
+        seen, params = [], {'limit': 2}
+        while True:
+            body = self.get('shifts', **params).json()
+            seen += [row['id'] for row in body['results']]
+            if not body['next']:
+                break
+            params['cursor'] = parse_qs(urlsplit(body['next']).query)['cursor'][0]
+        expected = Shift.objects.order_by('updated_at', 'id').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_recent_changes_wait_for_the_sync_lag(self):
+        Shift.objects.filter(pk=self.shifts[0].pk).update(updated_at=timezone.now() - timedelta(minutes=5))
+        with self.settings(API_SYNC_LAG_SECONDS=60):
+            rows = self.get('shifts', fields='id').json()['results']
+        self.assertEqual(rows, [{'id': self.shifts[0].pk}])
+
+    def test_bad_cursor_is_rejected(self):
+        response = self.get('shifts', cursor='not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Invalid cursor.'})
+
+    def test_fields_selects_the_returned_fields(self):
+        body = self.get('shifts', fields='name,employees', limit=1).json()
+        self.assertEqual(body['results'], [{'name': 'Shift 0', 'employees': []}])
+        self.assertEqual(self.get('shifts', fields='name,password').status_code, 400)
+
+
+class BulkTests(ApiTestCase):
+    def leave(self, start_day, end_day):
+        year = timezone.localdate().year + 1
+        return {
+            'employee_id': self.employee.pk, 'leave_type': 'sick',
+            'start_date': date(year, 5, start_day).isoformat(), 'end_date': date(year, 5, end_day).isoformat(),
+        }
+
+    def test_invalid_item_writes_nothing(self):
+        response = self.bulk('leaves', [self.leave(1, 2), {**self.leave(5, 6), 'leave_type': 'unknown'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()['errors']), ['1'])
+        self.assertFalse(Leave.objects.exists())
+
+    def test_items_conflicting_with_each_other_write_nothing(self):
+        response = self.bulk('leaves', [self.leave(1, 3), self.leave(10, 11), self.leave(3, 4)])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {'errors': {'2': {'start_date': [
+            {'message': 'Overlaps another leave of the employee.', 'code': 'conflict'},
+        ]}}})
+        self.assertNotIn('leave_no_overlap', response.content.decode())
+        self.assertFalse(Leave.objects.exists())
+
+    def test_stale_version_conflicts(self):
+        shift = self.shifts[0]
+        stale = shift.version
+        shift.name = 'Changed'
+        shift.save()
+
+        response = self.bulk('shifts', [{'id': shift.pk, 'name': 'Mine', 'version': stale}], method='patch')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['index'], 0)
+        self.assertEqual(response.json()['current']['name'], 'Changed')
+        shift.refresh_from_db()
+        self.assertEqual(shift.name, 'Changed')
@@ -0,0 +1,156 @@
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
+
+from core.models import EditConflict
+
+from .resources import InvalidCursor, resources
+
+
+def is_valid_client(request):
+    """Check the bearer token an API client sends"""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and any(
+        constant_time_compare(token, expected) for expected in settings.API_TOKENS
+    )
+
+
+def api_view(view):
+    """Authenticate the client and resolve the ``resource`` URL argument"""
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, resource, *args, **kwargs):
+        if not is_valid_client(request):
+            return JsonResponse({'error': 'Invalid API token.'}, status=401)
+        if resource not in resources:
+            return JsonResponse({'error': f'Unknown resource {resource!r}.'}, status=404)
+        return view(request, resources[resource], *args, **kwargs)
+    return wrapper
+
+
+@api_view
+@require_GET
+def collection(request, resource):
+    """One page of a resource, oldest change first.
+
+    ``fields`` picks the returned fields, ``updated_since`` limits the rows to
+    those changed since an ISO timestamp, ``limit`` sets the page size and
+    ``cursor`` continues from the ``next`` value of the previous page. Rows
+    changed in the last API_SYNC_LAG_SECONDS show up on a later request.
+    """
+    fields = resource.fields
+    if request.GET.get('fields'):
+        fields = request.GET['fields'].split(',')
+        unknown = [name for name in fields if name not in resource.fields]
+        if unknown:
+            return JsonResponse({'error': f"Unknown fields: {', '.join(unknown)}."}, status=400)
+
+    updated_since = None
+    if request.GET.get('updated_since'):
+        try:
+            updated_since = parse_datetime(request.GET['updated_since'])
+        except ValueError:
+            pass
+        if updated_since is None:
+            return JsonResponse({'error': 'updated_since must be an ISO 8601 datetime.'}, status=400)
+
+    try:
+        limit = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number.'}, status=400)
+    limit = max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+
+    try:
+        rows, next_cursor = resource.page(
+            fields, updated_since=updated_since, cursor=request.GET.get('cursor'), limit=limit
+        )
+    except InvalidCursor as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    next_url = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+    return JsonResponse({'results': rows, 'next': next_url})
+
+
+@api_view
+@require_http_methods(['POST', 'PATCH'])
+def bulk(request, resource):
+    """Create (POST) or update (PATCH, each item with its ``id``) many rows at once.
+
+    Every item is validated first; nothing is written unless all of them are
+    valid, and the writes share one transaction. An update that sends the
+    ``version`` it read is refused with 409 if the row changed since, as is
+    an item that breaks a constraint, e.g. by overlapping an earlier item.
+    """
+    try:
+        items = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Body must be JSON.'}, status=400)
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return JsonResponse({'error': 'Body must be a list of objects.'}, status=400)
+    if len(items) > settings.API_MAX_BULK_SIZE:
+        return JsonResponse(
+            {'error': f'At most {settings.API_MAX_BULK_SIZE} items per request.'}, status=413
+        )
+
+    updating = request.method == 'PATCH'
+    instances = {}
+    if updating:
+        instances = resource.model.objects.in_bulk(
+            [item['id'] for item in items if isinstance(item.get('id'), int)]
+        )
+
+    forms, errors = [], {}
+    for index, item in enumerate(items):
+        instance = None
+        if updating:
+            instance = instances.get(item.get('id'))
+            if instance is None:
+                errors[index] = {'id': [{'message': 'No such row.', 'code': 'not_found'}]}
+                continue
+            item = {name: value for name, value in item.items() if name != 'id'}
+        form = resource.get_form(item, instance)
+        if form.is_valid():
+            forms.append((index, form))
+        else:
+            errors[index] = form.errors.get_json_data()
+    if errors:
+        return JsonResponse({'errors': errors}, status=400)
+
+    saving = None
+    try:
+        with transaction.atomic():
+            saved = []
+            for saving, form in forms:
+                saved.append(form.save())
+            saving = None
+    except IntegrityError as error:
+        # Items that only conflict with each other pass form validation
+        if saving is None:
+            return JsonResponse({'error': 'Items conflict with each other or with stored rows.'}, status=409)
+        return JsonResponse({'errors': {saving: resource.conflict_errors(error)}}, status=409)
+    except EditConflict as conflict:
+        current = resource.rows(resource.model.objects.filter(pk=conflict.current.pk), resource.fields)
+        return JsonResponse({'error': str(conflict), 'index': saving, 'current': current[0]}, status=409)
+    except ValidationError as error:
+        # Rechecked by the model under a lock, e.g. a leave's balance
+        form.add_error(None, error)
+        return JsonResponse({'errors': {saving: form.errors.get_json_data()}}, status=400)
+
+    queryset = resource.model.objects.filter(pk__in=[obj.pk for obj in saved])
+    rows = {row['id']: row for row in resource.rows(queryset, resource.fields)}
+    return JsonResponse(
+        {'results': [rows[obj.pk] for obj in saved]},
+        status=200 if updating else 201,
+    )
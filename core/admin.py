@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Employee, Shift
+from .models import AuditEntry, Employee, Job, LeaveBalance, LeaveLedgerEntry, Punch, Shift, ShiftArchive
 
 
 @admin.register(Employee)
@@ -26,10 +26,10 @@ class EmployeeAdmin(admin.ModelAdmin):
 
 @admin.register(Shift)
 class ShiftAdmin(admin.ModelAdmin):
-    list_display = ['name', 'start_time', 'end_time', 'duration_display', 'employee_count', 'status']
+    list_display = ['name', 'start_time', 'end_time', 'duration_display', 'assigned_count', 'required_headcount', 'status']
     list_filter = ['start_time', 'end_time', 'created_at']
     search_fields = ['name']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['assigned_count', 'created_at', 'updated_at']
     filter_horizontal = ['employees']
     
     fieldsets = (
@@ -37,7 +37,7 @@ class ShiftAdmin(admin.ModelAdmin):
             'fields': ('name', 'start_time', 'end_time')
         }),
         ('Employees', {
-            'fields': ('employees',)
+            'fields': ('required_headcount', 'assigned_count', 'employees')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -50,10 +50,6 @@ class ShiftAdmin(admin.ModelAdmin):
         return f"{hours:.2f} hours"
     duration_display.short_description = 'Duration'
     
-    def employee_count(self, obj):
-        return obj.employees.count()
-    employee_count.short_description = 'Employees'
-    
     def status(self, obj):
         if obj.is_active():
             return format_html('<span style="color: green;">Active</span>')
@@ -62,3 +58,87 @@ class ShiftAdmin(admin.ModelAdmin):
         else:
             return format_html('<span style="color: blue;">Upcoming</span>')
     status.short_description = 'Status'
+
+
+@admin.register(ShiftArchive)
+class ShiftArchiveAdmin(admin.ModelAdmin):
+    list_display = ['name', 'start_time', 'end_time', 'duration_display', 'archived_at']
+    list_filter = ['start_time', 'archived_at']
+    search_fields = ['name']
+    readonly_fields = ['created_at', 'updated_at', 'archived_at']
+    filter_horizontal = ['employees']
+
+    def duration_display(self, obj):
+        hours = obj.duration_hours()
+        return f"{hours:.2f} hours"
+    duration_display.short_description = 'Duration'
+
+
+@admin.register(Punch)
+class PunchAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'punch_type', 'punched_at', 'shift', 'deviation_minutes', 'terminal']
+    list_filter = ['punch_type', 'terminal', 'punched_at']
+    search_fields = ['employee__name', 'punch_id']
+    raw_id_fields = ['employee', 'shift']
+    readonly_fields = ['created_at']
+    # Joined, so the shift of an archived punch shows as empty instead of failing
+    list_select_related = ['employee', 'shift']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'progress', 'progress_total', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'name']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'updated_at']
+
+
+@admin.register(LeaveLedgerEntry)
+class LeaveLedgerEntryAdmin(admin.ModelAdmin):
+    """Read-only: entries are appended by core.ledger and never edited"""
+    list_display = ['employee', 'leave_type', 'year', 'kind', 'days', 'leave_id', 'note', 'created_at']
+    list_filter = ['kind', 'leave_type', 'year']
+    search_fields = ['employee__name']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(LeaveBalance)
+class LeaveBalanceAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'leave_type', 'year', 'accrued', 'used', 'remaining', 'updated_at']
+    list_filter = ['leave_type', 'year']
+    search_fields = ['employee__name']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AuditEntry)
+class AuditEntryAdmin(admin.ModelAdmin):
+    """Read-only: entries are written by core.audit and never edited"""
+    list_display = ['created_at', 'object_type', 'object_id', 'action', 'actor']
+    list_filter = ['object_type', 'action']
+    list_select_related = ['actor']
+    # The table only grows; don't count all of it on every page
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,96 @@
+"""Time-clock punch ingestion.
+
+Terminals post one punch or a batch of them. A batch is validated, matched to
+the employees' assigned shifts with a single query, and written with one
+INSERT ... ON CONFLICT DO NOTHING, so retried punches are dropped by the
+(terminal, punch_id) unique constraint instead of being stored twice.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Employee, Punch, Shift
+
+PUNCH_TYPES = {choice for choice, _ in Punch.PUNCH_TYPE_CHOICES}
+
+
+def build_punches(items):
+    """Validate raw punch dicts; return (unsaved punches, errors by index)"""
+    punches = []
+    errors = []
+    employee_ids = {item.get('employee') for item in items if isinstance(item, dict)}
+    known_employees = set(
+        Employee.objects.filter(pk__in=[pk for pk in employee_ids if isinstance(pk, int)])
+        .values_list('pk', flat=True)
+    )
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'error': 'Punch must be an object.'})
+            continue
+        punched_at = parse_datetime(str(item.get('punched_at', '')))
+        if punched_at is None:
+            errors.append({'index': index, 'error': 'punched_at must be an ISO 8601 datetime.'})
+            continue
+        if timezone.is_naive(punched_at):
+            punched_at = timezone.make_aware(punched_at)
+        if item.get('employee') not in known_employees:
+            errors.append({'index': index, 'error': 'Unknown employee.'})
+            continue
+        if item.get('punch_type') not in PUNCH_TYPES:
+            errors.append({'index': index, 'error': 'punch_type must be "in" or "out".'})
+            continue
+        terminal = str(item.get('terminal', ''))[:50]
+        punch_id = str(item.get('punch_id', ''))[:64]
+        if not terminal or not punch_id:
+            errors.append({'index': index, 'error': 'terminal and punch_id are required.'})
+            continue
+        punches.append(Punch(
+            employee_id=item['employee'],
+            punch_type=item['punch_type'],
+            punched_at=punched_at,
+            terminal=terminal,
+            punch_id=punch_id,
+        ))
+    return punches, errors
+
+
+def match_shifts(punches):
+    """Attach the nearest assigned shift and the deviation to each punch"""
+    if not punches:
+        return
+    window = timedelta(minutes=settings.ATTENDANCE_MATCH_WINDOW_MINUTES)
+    times = [punch.punched_at for punch in punches]
+
+    candidates = {}
+    Assignment = Shift.employees.through
+    for employee_id, shift_id, start_time, end_time in Assignment.objects.filter(
+        employee_id__in={punch.employee_id for punch in punches},
+        shift__start_time__lte=max(times) + window,
+        shift__end_time__gte=min(times) - window,
+    ).values_list('employee_id', 'shift_id', 'shift__start_time', 'shift__end_time'):
+        candidates.setdefault(employee_id, []).append((shift_id, start_time, end_time))
+
+    for punch in punches:
+        best = None
+        for shift_id, start_time, end_time in candidates.get(punch.employee_id, ()):
+            boundary = start_time if punch.punch_type == 'in' else end_time
+            distance = abs(punch.punched_at - boundary)
+            if distance <= window and (best is None or distance < best[0]):
+                best = (distance, shift_id, boundary)
+        if best is None:
+            continue
+        _, punch.shift_id, boundary = best
+        if punch.punch_type == 'in':
+            deviation = punch.punched_at - boundary
+        else:
+            deviation = boundary - punch.punched_at
+        punch.deviation_minutes = int(deviation.total_seconds() / 60)
+
+
+def record_punches(punches):
+    """Match and store a batch of punches in one INSERT; duplicates are skipped"""
+    match_shifts(punches)
+    Punch.objects.bulk_create(punches, batch_size=1000, ignore_conflicts=True)
@@ -0,0 +1,235 @@
+"""Write-behind audit trail of changes to employees, shifts and leaves.
+
+core.signals hands every save, delete and (un)assignment to this module,
+which turns it into an unsaved AuditEntry holding a field-level diff. The
+diff is taken against the values the instance was read with (see
+TrackedModel), so recording a change costs no query.
+
+Entries wait for their transaction to commit, and are dropped with it if it
+rolls back. Committed entries then collect in a per-thread buffer:
+AuditMiddleware writes a request's entries with one bulk_create once the
+response has been sent, and :func:`buffered` does the same around any other
+block of code. Outside both, each entry is written when it commits.
+
+The table is partitioned by month of ``created_at``. :func:`create_partitions`
+and :func:`drop_partitions`, run by ``manage.py audit_partitions``, create
+partitions ahead of time and enforce AUDIT_RETENTION_MONTHS. Rows of a month
+without a partition land in the default partition until one is created.
+"""
+import logging
+import re
+import threading
+from contextlib import contextmanager
+from datetime import date
+from functools import partial
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .models import AuditEntry, Employee, Leave, Shift
+
+logger = logging.getLogger(__name__)
+
+AUDITED_MODELS = {model._meta.model_name: model for model in (Employee, Shift, Leave)}
+
+# Bookkeeping and secrets, left out of diffs
+IGNORED_FIELDS = {'created_at', 'updated_at', 'version', 'assigned_count', 'calendar_token'}
+
+TABLE = AuditEntry._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_NAME = re.compile(rf'^{TABLE}_p(\d{{4}})(\d{{2}})$')
+
+_buffer = threading.local()
+
+
+def audited_fields(instance, names=None):
+    deferred = instance.get_deferred_fields()
+    return [
+        field for field in instance._meta.concrete_fields
+        if not field.primary_key
+        and field.name not in IGNORED_FIELDS
+        and field.attname not in deferred
+        and (names is None or field.name in names)
+    ]
+
+
+def saved_changes(instance, created, update_fields=None):
+    """``{field: [old, new]}`` for what a save wrote"""
+    loaded = {} if created else getattr(instance, '_loaded_values', {})
+    changes = {}
+    for field in audited_fields(instance, update_fields):
+        old = loaded.get(field.attname)
+        new = getattr(instance, field.attname)
+        if (new not in (None, '')) if created else old != new:
+            changes[field.name] = [old, new]
+    return changes
+
+
+def record(object_type, object_id, action, changes):
+    """Queue an entry; it is written after the current transaction commits"""
+    user = getattr(_buffer, 'user', None)
+    entry = AuditEntry(
+        created_at=timezone.now(),
+        actor_id=user.pk if user is not None and user.is_authenticated else None,
+        object_type=object_type,
+        object_id=object_id,
+        action=action,
+        changes=changes,
+    )
+    transaction.on_commit(partial(_committed, entry))
+
+
+def record_save(instance, created, update_fields=None):
+    changes = saved_changes(instance, created, update_fields)
+    if changes:
+        record(instance._meta.model_name, instance.pk, 'create' if created else 'update', changes)
+
+
+def record_delete(instance):
+    record(instance._meta.model_name, instance.pk, 'delete', {
+        field.name: [getattr(instance, field.attname), None] for field in audited_fields(instance)
+    })
+
+
+def record_assignment(instance, action, pk_set, reverse=False):
+    """Record employees (un)assigned from a shift, on the shift's history.
+
+    With ``reverse`` the instance is an employee and ``pk_set`` holds shifts.
+    """
+    if not pk_set:
+        return
+    if not reverse:
+        record('shift', instance.pk, action, {'employees': sorted(pk_set)})
+        return
+    for shift_id in sorted(pk_set):
+        record('shift', shift_id, action, {'employees': [instance.pk]})
+
+
+def _committed(entry):
+    pending = getattr(_buffer, 'pending', None)
+    if pending is None:
+        _write([entry])
+    else:
+        pending.append(entry)
+
+
+def _write(entries):
+    try:
+        with transaction.atomic():
+            AuditEntry.objects.bulk_create(entries)
+    except DatabaseError:
+        # The changes themselves are committed; don't fail them afterwards
+        logger.exception('Could not write %d audit entries', len(entries))
+
+
+def start(user=None):
+    """Buffer the entries committed from now on in this thread, attributed to ``user``"""
+    flush()
+    _buffer.pending = []
+    _buffer.user = user
+
+
+def flush():
+    """Write the buffered entries with one INSERT and stop buffering"""
+    pending = getattr(_buffer, 'pending', None)
+    _buffer.pending = _buffer.user = None
+    if pending:
+        _write(pending)
+
+
+@contextmanager
+def buffered(user=None):
+    """Write the audit entries of the block at its end, with one INSERT"""
+    if getattr(_buffer, 'pending', None) is not None:
+        # Already buffering, e.g. in a request
+        yield
+        return
+    start(user)
+    try:
+        yield
+    finally:
+        flush()
+
+
+def month_start(day, offset=0):
+    """First day of the month ``offset`` months after ``day``'s"""
+    months = day.year * 12 + day.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def partitions():
+    """``{name: first day of its month}`` of the monthly partitions"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = %s::regclass',
+            [TABLE],
+        )
+        names = [name for name, in cursor.fetchall()]
+    found = {}
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            found[name] = date(int(match.group(1)), int(match.group(2)), 1)
+    return found
+
+
+def create_partitions(ahead=None, today=None):
+    """Create the partitions from this month to ``ahead`` months on; returns their names.
+
+    Entries of those months already in the default partition move to the
+    new partition.
+    """
+    if ahead is None:
+        ahead = settings.AUDIT_PARTITIONS_AHEAD
+    today = today or timezone.now().date()
+    existing = partitions()
+    created = []
+    quote = connection.ops.quote_name
+    for offset in range(ahead + 1):
+        start, end = month_start(today, offset), month_start(today, offset + 1)
+        name = f'{TABLE}_p{start:%Y%m}'
+        if name in existing:
+            continue
+        bounds = f"FROM ('{start.isoformat()} 00:00+00') TO ('{end.isoformat()} 00:00+00')"
+        in_month = f"created_at >= '{start.isoformat()} 00:00+00' AND created_at < '{end.isoformat()} 00:00+00'"
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {quote(DEFAULT_PARTITION)} WHERE {in_month})')
+            misplaced = cursor.fetchone()[0]
+            if misplaced:
+                # A partition can't be added while the default one holds rows for it
+                cursor.execute(f'ALTER TABLE {quote(TABLE)} DETACH PARTITION {quote(DEFAULT_PARTITION)}')
+            cursor.execute(f'CREATE TABLE {quote(name)} PARTITION OF {quote(TABLE)} FOR VALUES {bounds}')
+            if misplaced:
+                cursor.execute(
+                    f'WITH moved AS (DELETE FROM {quote(DEFAULT_PARTITION)} WHERE {in_month} RETURNING *) '
+                    f'INSERT INTO {quote(TABLE)} SELECT * FROM moved'
+                )
+                cursor.execute(f'ALTER TABLE {quote(TABLE)} ATTACH PARTITION {quote(DEFAULT_PARTITION)} DEFAULT')
+        created.append(name)
+    return created
+
+
+def drop_partitions(retention_months=None, today=None):
+    """Drop the partitions older than ``retention_months`` full months; returns their names.
+
+    Older rows in the default partition are deleted too. A retention of 0
+    keeps everything.
+    """
+    if retention_months is None:
+        retention_months = settings.AUDIT_RETENTION_MONTHS
+    if not retention_months:
+        return []
+    cutoff = month_start(today or timezone.now().date(), -retention_months)
+    quote = connection.ops.quote_name
+    dropped = []
+    with connection.cursor() as cursor:
+        for name, start in sorted(partitions().items(), key=lambda item: item[1]):
+            if month_start(start, 1) <= cutoff:
+                cursor.execute(f'DROP TABLE {quote(name)}')
+                dropped.append(name)
+        cursor.execute(
+            f"DELETE FROM {quote(DEFAULT_PARTITION)} WHERE created_at < '{cutoff.isoformat()} 00:00+00'"
+        )
+    return dropped
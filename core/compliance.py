@@ -0,0 +1,156 @@
+"""Labor-rule compliance checks.
+
+Each rule is one ``INSERT ... SELECT`` that evaluates every employee in a
+single set-based pass (window functions and aggregates over all shift
+assignments), so a company-wide audit costs four queries no matter how many
+employees or shifts there are. Checking only some employees runs the same
+statements with an employee filter.
+
+Edits call :func:`mark_employees_changed`; once the transaction commits,
+the affected employees are re-checked by a ``check_compliance`` background
+job, so saving a shift or leave doesn't wait for the rules.
+"""
+import threading
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import jobqueue
+from .models import ComplianceViolation
+
+# Every shift assignment in the checked window, with its local start and end day
+ASSIGNMENTS = """
+WITH assignments AS (
+    SELECT a.employee_id,
+           s.id AS shift_id,
+           s.start_time,
+           s.end_time,
+           (s.start_time AT TIME ZONE %(tz)s)::date AS start_day,
+           ((s.end_time - interval '1 second') AT TIME ZONE %(tz)s)::date AS end_day
+    FROM core_shift_employees a
+    JOIN core_shift s ON s.id = a.shift_id
+    WHERE s.end_time >= %(window_start)s
+      AND (%(everyone)s OR a.employee_id = ANY(%(employee_ids)s))
+)
+INSERT INTO core_complianceviolation
+    (employee_id, rule, shift_id, period_start, period_end, value, threshold, detected_at)
+SELECT * FROM (
+"""
+
+# Keeps what a rule found in the replaced period; the rows read before it
+# only complete the weeks and runs that cross its start
+REPLACED_PERIOD = """
+) found (employee_id, rule, shift_id, period_start, period_end, value, threshold, detected_at)
+WHERE period_end >= %(since)s
+"""
+
+RULES = {
+    # Scheduled hours per week above the employee's working hours
+    'weekly_hours': """
+        SELECT w.employee_id, 'weekly_hours', NULL::bigint, w.week, w.week + 6, w.hours, e.working_hours, now()
+        FROM (
+            SELECT employee_id,
+                   date_trunc('week', start_day + %(week_offset)s)::date - %(week_offset)s AS week,
+                   sum(extract(epoch FROM end_time - start_time)) / 3600 AS hours
+            FROM assignments
+            GROUP BY 1, 2
+        ) w
+        JOIN core_employee e ON e.id = w.employee_id
+        WHERE e.working_hours > 0 AND w.hours > e.working_hours
+    """,
+    # Too little time off between the end of one shift and the start of the next
+    'min_rest': """
+        SELECT employee_id, 'min_rest', shift_id, start_day, start_day, rest_hours, %(min_rest)s, now()
+        FROM (
+            SELECT employee_id, shift_id, start_day,
+                   extract(epoch FROM start_time - lag(end_time) OVER (
+                       PARTITION BY employee_id ORDER BY start_time, shift_id
+                   )) / 3600 AS rest_hours
+            FROM assignments
+        ) r
+        WHERE rest_hours < %(min_rest)s
+    """,
+    # Runs of consecutive working days; day minus its rank is constant within a run
+    'consecutive_days': """
+        SELECT employee_id, 'consecutive_days', NULL::bigint, min(day), max(day), count(*), %(max_days)s, now()
+        FROM (
+            SELECT employee_id, day,
+                   day - (row_number() OVER (PARTITION BY employee_id ORDER BY day))::integer AS run
+            FROM (SELECT DISTINCT employee_id, start_day AS day FROM assignments) days
+        ) runs
+        GROUP BY employee_id, run
+        HAVING count(*) > %(max_days)s
+    """,
+    # Shifts on days the employee has approved leave
+    'leave_overlap': """
+        SELECT a.employee_id, 'leave_overlap', a.shift_id,
+               greatest(l.start_date, a.start_day), least(l.end_date, a.end_day),
+               least(l.end_date, a.end_day) - greatest(l.start_date, a.start_day) + 1, 0, now()
+        FROM assignments a
+        JOIN core_leave l
+          ON l.employee_id = a.employee_id
+         AND l.status = 'approved'
+         AND daterange(l.start_date, l.end_date, '[]') && daterange(a.start_day, a.end_day, '[]')
+    """,
+}
+
+
+def window_start(since):
+    """First day whose shifts are read to re-check from ``since`` on.
+
+    The week containing ``since`` and a run of consecutive days reaching it
+    may start earlier; both are read whole.
+    """
+    week_start = since - timedelta(days=(since.weekday() - settings.COMPLIANCE_WEEK_START) % 7)
+    return min(week_start, since - timedelta(days=settings.COMPLIANCE_MAX_CONSECUTIVE_DAYS))
+
+
+def check(employee_ids=None, since=None):
+    """Replace the violations from ``since`` on, for everyone or the given employees.
+
+    Returns the number of violations found per rule.
+    """
+    if since is None:
+        since = timezone.localdate() - timedelta(days=settings.COMPLIANCE_LOOKBACK_DAYS)
+    params = {
+        'tz': settings.TIME_ZONE,
+        'since': since,
+        'window_start': timezone.make_aware(datetime.combine(window_start(since), time.min)),
+        'everyone': employee_ids is None,
+        'employee_ids': list(employee_ids or []),
+        'week_offset': (7 - settings.COMPLIANCE_WEEK_START) % 7,
+        'min_rest': settings.COMPLIANCE_MIN_REST_HOURS,
+        'max_days': settings.COMPLIANCE_MAX_CONSECUTIVE_DAYS,
+    }
+    found = {}
+    with transaction.atomic():
+        stale = ComplianceViolation.objects.filter(period_end__gte=since)
+        if employee_ids is not None:
+            stale = stale.filter(employee_id__in=params['employee_ids'])
+        stale.delete()
+        with connection.cursor() as cursor:
+            for rule, sql in RULES.items():
+                cursor.execute(ASSIGNMENTS + sql + REPLACED_PERIOD, params)
+                found[rule] = cursor.rowcount
+    return found
+
+
+_changed = threading.local()
+
+
+def mark_employees_changed(employee_ids):
+    """Queue a re-check of these employees once the current transaction commits"""
+    pending = _changed.__dict__.setdefault('employee_ids', set())
+    pending.update(pk for pk in employee_ids if pk is not None)
+    # One callback per edit, but the first one to run takes the whole set.
+    # Ids left over from a rolled-back transaction are simply re-checked
+    # with the next commit.
+    transaction.on_commit(queue_recheck)
+
+
+def queue_recheck():
+    employee_ids = _changed.__dict__.pop('employee_ids', None)
+    if employee_ids:
+        jobqueue.enqueue('check_compliance', employee_ids=sorted(employee_ids))
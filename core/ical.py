@@ -0,0 +1,140 @@
+"""Subscribable iCalendar (.ics) feeds of an employee's shifts and leaves.
+
+A feed is rendered once and kept in the cache under the employee's calendar
+token together with its ETag, so polling calendar clients are answered from
+the cache (or with a 304) until the schedule changes.
+
+Each token also has a generation (a core.versions token) that core.signals
+bumps once a change to the employee's shifts or leaves commits. A cached
+feed only counts if it was rendered under the current generation, and a
+render is only cached if the generation didn't move while it ran: a request
+that read the schedule just before a change committed can't store it again.
+"""
+import hashlib
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Employee
+from .versions import bump_version, get_versions, version_key
+
+PRODID = '-//ShiftFlow//Schedule//FA'
+
+
+def feed_cache_key(token):
+    return f'ical:{token}'
+
+
+def generation_name(token):
+    return f'ical:{token}'
+
+
+def forget_feeds(tokens):
+    """Start a new generation for these feed tokens, dropping their cached feeds"""
+    for token in tokens:
+        bump_version(generation_name(token))
+    cache.delete_many([feed_cache_key(token) for token in tokens])
+
+
+def invalidate_feeds(employee_ids):
+    """Forget the cached feeds of the given employees"""
+    employee_ids = [pk for pk in employee_ids if pk is not None]
+    if not employee_ids:
+        return
+    forget_feeds(Employee.objects.filter(pk__in=employee_ids).values_list('calendar_token', flat=True))
+
+
+def get_feed(token):
+    """Return ``(etag, body)`` for the feed with this token, or ``None``"""
+    key = feed_cache_key(token)
+    name = generation_name(token)
+    found = cache.get_many([key, version_key(name)])
+    generation = found.get(version_key(name)) or get_versions(name)[name]
+    cached = found.get(key)
+    if cached is not None and cached[0] == generation:
+        return cached[1:]
+
+    employee = Employee.objects.filter(calendar_token=token).first()
+    if employee is None:
+        return None
+    body = render_feed(employee).encode()
+    feed = (hashlib.sha1(body).hexdigest(), body)
+    if get_versions(name)[name] == generation:
+        cache.set(key, (generation, *feed), settings.ICAL_CACHE_TIMEOUT)
+    return feed
+
+
+def render_feed(employee):
+    since = timezone.now() - timedelta(days=settings.ICAL_PAST_DAYS)
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape(employee.name)}',
+        f'X-WR-TIMEZONE:{settings.TIME_ZONE}',
+        f'REFRESH-INTERVAL;VALUE=DURATION:PT{settings.ICAL_REFRESH_MINUTES}M',
+        f'X-PUBLISHED-TTL:PT{settings.ICAL_REFRESH_MINUTES}M',
+    ]
+    for shift in employee.shifts.filter(end_time__gte=since).order_by('start_time'):
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:shift-{shift.pk}@shiftflow',
+            f'DTSTAMP:{format_utc(shift.updated_at)}',
+            f'LAST-MODIFIED:{format_utc(shift.updated_at)}',
+            f'DTSTART:{format_utc(shift.start_time)}',
+            f'DTEND:{format_utc(shift.end_time)}',
+            f'SUMMARY:{escape(shift.name)}',
+            'END:VEVENT',
+        ]
+    leaves = employee.leaves.approved().filter(end_date__gte=timezone.localdate(since))
+    for leave in leaves.order_by('start_date'):
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:leave-{leave.pk}@shiftflow',
+            f'DTSTAMP:{format_utc(leave.updated_at)}',
+            f'LAST-MODIFIED:{format_utc(leave.updated_at)}',
+            f'DTSTART;VALUE=DATE:{leave.start_date:%Y%m%d}',
+            # DTEND of an all-day event is exclusive
+            f'DTEND;VALUE=DATE:{leave.end_date + timedelta(days=1):%Y%m%d}',
+            f'SUMMARY:{escape(leave.get_leave_type_display())}',
+            'TRANSP:TRANSPARENT',
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    return ''.join(fold(line) + '\r\n' for line in lines)
+
+
+def format_utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def escape(text):
+    return (
+        text.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold(line, limit=75):
+    """Split a content line into 75-octet pieces without breaking UTF-8 characters"""
+    if len(line.encode()) <= limit:
+        return line
+    parts = []
+    current, size = '', 0
+    for char in line:
+        width = len(char.encode())
+        # Continuation lines start with a space, which counts toward the limit
+        if size + width > (limit if not parts else limit - 1):
+            parts.append(current)
+            current, size = '', 0
+        current += char
+        size += width
+    parts.append(current)
+    return '\r\n '.join(parts)
@@ -0,0 +1,180 @@
+"""Jalali (Persian solar hijri) calendar dates.
+
+Conversions go through a table of the Gregorian date of Nowruz (1
+Farvardin) for every supported year, built once at import. Converting a
+date is then a binary search and a subtraction, and walking a range of days
+(:func:`iter_days`) only converts its first day.
+
+The table is computed with the break-year rule of the jalaali-js / Borkowski
+algorithm, which matches the official calendar for the supported years.
+"""
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+
+from django.utils import dateformat, timezone
+
+MONTH_NAMES = [
+    'فروردین', 'اردیبهشت', 'خرداد', 'تیر', 'مرداد', 'شهریور',
+    'مهر', 'آبان', 'آذر', 'دی', 'بهمن', 'اسفند',
+]
+# Index 0 is Saturday, the first day of the Persian week
+WEEKDAY_NAMES = ['شنبه', 'یکشنبه', 'دوشنبه', 'سه‌شنبه', 'چهارشنبه', 'پنجشنبه', 'جمعه']
+
+FIRST_YEAR, LAST_YEAR = 1300, 1499
+
+# Day of the year each month starts on; Esfand has 29 days, 30 in leap years
+MONTH_STARTS = [0, 31, 62, 93, 124, 155, 186, 216, 246, 276, 306, 336]
+
+# Jalali years where the pattern of 33-year leap cycles shifts
+BREAKS = [-61, 9, 38, 199, 426, 686, 756, 818, 1111, 1181, 1210, 1635, 2060, 2097, 2192, 2262, 2324, 2394, 2456, 3178]
+
+
+def _nowruz(year):
+    """Gregorian date of 1 Farvardin ``year``"""
+    jump = 0
+    leap_jalali = -14
+    previous = BREAKS[0]
+    for current in BREAKS[1:]:
+        jump = current - previous
+        if year < current:
+            break
+        leap_jalali += jump // 33 * 8 + jump % 33 // 4
+        previous = current
+    elapsed = year - previous
+    leap_jalali += elapsed // 33 * 8 + (elapsed % 33 + 3) // 4
+    if jump % 33 == 4 and jump - elapsed == 4:
+        leap_jalali += 1
+    gregorian_year = year + 621
+    leap_gregorian = gregorian_year // 4 - (gregorian_year // 100 + 1) * 3 // 4 - 150
+    return date(gregorian_year, 3, 20 + leap_jalali - leap_gregorian)
+
+
+# Ordinal of Nowruz for FIRST_YEAR..LAST_YEAR + 1; the last entry ends LAST_YEAR
+NOWRUZ = [_nowruz(year).toordinal() for year in range(FIRST_YEAR, LAST_YEAR + 2)]
+MIN_DATE = date.fromordinal(NOWRUZ[0])
+MAX_DATE = date.fromordinal(NOWRUZ[-1] - 1)
+
+
+class JalaliDate(NamedTuple):
+    year: int
+    month: int
+    day: int
+
+    def __str__(self):
+        return f'{self.year:04d}/{self.month:02d}/{self.day:02d}'
+
+    @property
+    def month_name(self):
+        return MONTH_NAMES[self.month - 1]
+
+    def to_gregorian(self):
+        return to_gregorian(*self)
+
+
+def check_year(year):
+    if not FIRST_YEAR <= year <= LAST_YEAR:
+        raise ValueError(f'Jalali year {year} is outside {FIRST_YEAR}-{LAST_YEAR}.')
+
+
+def is_leap(year):
+    check_year(year)
+    return NOWRUZ[year - FIRST_YEAR + 1] - NOWRUZ[year - FIRST_YEAR] == 366
+
+
+def month_length(year, month):
+    if month <= 6:
+        return 31
+    if month <= 11:
+        return 30
+    return 30 if is_leap(year) else 29
+
+
+def to_jalali(value):
+    """JalaliDate of a date, or of a datetime's local date"""
+    if isinstance(value, datetime):
+        value = timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    ordinal = value.toordinal()
+    index = bisect_right(NOWRUZ, ordinal) - 1
+    if not 0 <= index < len(NOWRUZ) - 1:
+        raise ValueError(f'{value} is outside {MIN_DATE}-{MAX_DATE}.')
+    day_of_year = ordinal - NOWRUZ[index]
+    month = bisect_right(MONTH_STARTS, day_of_year)
+    return JalaliDate(FIRST_YEAR + index, month, day_of_year - MONTH_STARTS[month - 1] + 1)
+
+
+def to_gregorian(year, month, day):
+    check_year(year)
+    if not 1 <= month <= 12 or not 1 <= day <= month_length(year, month):
+        raise ValueError(f'{year}/{month}/{day} is not a Jalali date.')
+    return date.fromordinal(NOWRUZ[year - FIRST_YEAR] + MONTH_STARTS[month - 1] + day - 1)
+
+
+def add_months(year, month, months):
+    """``(year, month)`` of the Jalali month ``months`` after the given one"""
+    index = year * 12 + month - 1 + months
+    return index // 12, index % 12 + 1
+
+
+def weekday(value):
+    """Day of the Persian week, Saturday being 0"""
+    return (value.weekday() + 2) % 7
+
+
+def iter_days(start, end):
+    """``(date, JalaliDate)`` for every day from ``start`` to ``end`` inclusive.
+
+    Only ``start`` is converted; the following days are counted on from it.
+    """
+    year, month, day = to_jalali(start)
+    length = month_length(year, month)
+    for offset in range((end - start).days + 1):
+        yield start + timedelta(days=offset), JalaliDate(year, month, day)
+        day += 1
+        if day > length:
+            year, month = add_months(year, month, 1)
+            day = 1
+            length = month_length(year, month)
+
+
+# Format characters of Django's date filter that refer to the calendar date
+DATE_FORMATS = {
+    'd': lambda value, jalali: f'{jalali.day:02d}',
+    'j': lambda value, jalali: str(jalali.day),
+    'm': lambda value, jalali: f'{jalali.month:02d}',
+    'n': lambda value, jalali: str(jalali.month),
+    'F': lambda value, jalali: jalali.month_name,
+    'M': lambda value, jalali: jalali.month_name,
+    'N': lambda value, jalali: jalali.month_name,
+    'Y': lambda value, jalali: str(jalali.year),
+    'y': lambda value, jalali: f'{jalali.year % 100:02d}',
+    'l': lambda value, jalali: WEEKDAY_NAMES[weekday(value)],
+    'D': lambda value, jalali: WEEKDAY_NAMES[weekday(value)],
+    't': lambda value, jalali: str(month_length(jalali.year, jalali.month)),
+    'L': lambda value, jalali: str(is_leap(jalali.year)),
+}
+
+
+def format_date(value, format_string):
+    """Like Django's ``date`` filter, with day, month and year in the Jalali calendar.
+
+    Other format characters, such as the time ones, are left to Django.
+    """
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        value = timezone.localtime(value)
+    jalali = to_jalali(value)
+    parts = []
+    escaped = False
+    for char in format_string:
+        if escaped:
+            parts.append(char)
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char in DATE_FORMATS:
+            parts.append(DATE_FORMATS[char](value, jalali))
+        elif char.isalpha():
+            parts.append(dateformat.format(value, char))
+        else:
+            parts.append(char)
+    return ''.join(parts)
@@ -0,0 +1,143 @@
+"""Background jobs stored in PostgreSQL.
+
+Job functions are registered by name in each app's ``tasks`` module and are
+called with the running :class:`~core.models.Job` plus the job's kwargs.
+Workers (``manage.py run_jobs``) claim queued jobs with
+``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of them can share the
+table without handing the same job out twice.
+"""
+import logging
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def register(name):
+    """Register the decorated function as the job called ``name``"""
+    def decorator(func):
+        registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, user=None, max_attempts=None, **kwargs):
+    """Queue a job to run on the next free worker and return it"""
+    if name not in registry:
+        raise KeyError(f'Unknown job {name!r}')
+    job = Job(name=name, kwargs=kwargs, created_by=user)
+    if max_attempts is not None:
+        job.max_attempts = max_attempts
+    job.save()
+    return job
+
+
+def set_progress(job, done, total=None, message=None):
+    """Record progress of a running job; also serves as its heartbeat"""
+    job.progress = done
+    fields = {'progress': done, 'updated_at': timezone.now()}
+    if total is not None:
+        job.progress_total = fields['progress_total'] = total
+    if message is not None:
+        job.message = fields['message'] = message[:255]
+    Job.objects.filter(pk=job.pk).update(**fields)
+
+
+def claim():
+    """Lock the next due job, mark it running and return it (or ``None``)"""
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', run_after__lte=now)
+            .order_by('run_after', 'pk')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.attempts += 1
+        job.started_at = now
+        job.save(update_fields=['status', 'attempts', 'started_at', 'updated_at'])
+    return job
+
+
+@contextmanager
+def heartbeat(job):
+    """Touch the job's ``updated_at`` from a background thread while the block runs.
+
+    Keeps a job that reports progress rarely, or not at all, from looking
+    stale to :func:`requeue_stale` while its worker is alive.
+    """
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.JOB_HEARTBEAT_SECONDS):
+                try:
+                    Job.objects.filter(pk=job.pk, status='running').update(updated_at=timezone.now())
+                except DatabaseError:
+                    logger.warning('Heartbeat of job %s failed', job, exc_info=True)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'job-{job.pk}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run(job):
+    """Run a claimed job, then record its result or schedule a retry"""
+    func = registry.get(job.name)
+    try:
+        if func is None:
+            raise KeyError(f'Unknown job {job.name!r}')
+        with heartbeat(job):
+            result = func(job, **job.kwargs)
+    except Exception:
+        job.error = traceback.format_exc()
+        if func is not None and job.attempts < job.max_attempts:
+            delay = settings.JOB_RETRY_DELAY_SECONDS * 2 ** (job.attempts - 1)
+            job.status = 'queued'
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+            logger.warning('Job %s failed, retrying in %ss', job, delay)
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+            logger.exception('Job %s failed', job)
+        job.save(update_fields=['status', 'run_after', 'error', 'finished_at', 'updated_at'])
+        return False
+
+    job.status = 'succeeded'
+    job.result = result
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'finished_at', 'updated_at'])
+    return True
+
+
+def requeue_stale():
+    """Put back running jobs whose worker stopped sending heartbeats"""
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status='running',
+        updated_at__lt=now - timedelta(seconds=settings.JOB_STALE_AFTER_SECONDS),
+    )
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', error='Worker stopped responding.', finished_at=now, updated_at=now
+    )
+    return stale.update(status='queued', run_after=now, updated_at=now)
@@ -0,0 +1,210 @@
+"""Leave balances kept as an append-only ledger.
+
+Every change to an employee's leave days is a LeaveLedgerEntry: yearly
+accruals, consumption when a leave is approved, and reversals when it is
+rejected, shortened or deleted. Each statement that appends entries also
+adds them to the matching LeaveBalance rows, so reading what is left is one
+lookup on the (employee, leave_type, year) unique index.
+
+Consumption is posted by comparing what each leave should have consumed
+with what the ledger already holds for it, so posting is idempotent and the
+same statement repairs the whole ledger when run for every leave.
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from .models import LeaveBalance, LeaveLedgerEntry
+from .versions import bump_version
+
+# Adds the rows returned by an ``entries`` CTE to the running balances
+UPSERT_BALANCES = """
+INSERT INTO core_leavebalance (employee_id, leave_type, year, accrued, used, updated_at)
+SELECT employee_id, leave_type, year,
+       coalesce(sum(days) FILTER (WHERE kind IN ('accrual', 'adjustment')), 0),
+       coalesce(-sum(days) FILTER (WHERE kind IN ('consumption', 'reversal')), 0),
+       now()
+FROM entries
+GROUP BY 1, 2, 3
+ON CONFLICT (employee_id, leave_type, year) DO UPDATE
+SET accrued = core_leavebalance.accrued + EXCLUDED.accrued,
+    used = core_leavebalance.used + EXCLUDED.used,
+    updated_at = EXCLUDED.updated_at
+"""
+
+POST_LEAVES = """
+WITH wanted AS (
+    -- Days each approved leave takes from each calendar year it touches
+    SELECT l.id AS leave_id, l.employee_id, l.leave_type, y.year,
+           least(l.end_date, make_date(y.year, 12, 31))
+             - greatest(l.start_date, make_date(y.year, 1, 1)) + 1 AS days
+    FROM core_leave l
+    CROSS JOIN LATERAL generate_series(
+        extract(year FROM l.start_date)::integer, extract(year FROM l.end_date)::integer
+    ) AS y(year)
+    WHERE l.status = 'approved'
+      AND (%(everyone)s OR l.id = ANY(%(leave_ids)s))
+), posted AS (
+    SELECT leave_id, employee_id, leave_type, year, -sum(days) AS days
+    FROM core_leaveledgerentry
+    WHERE kind IN ('consumption', 'reversal')
+      AND leave_id IS NOT NULL
+      AND (%(everyone)s OR leave_id = ANY(%(leave_ids)s))
+    GROUP BY 1, 2, 3, 4
+), entries AS (
+    INSERT INTO core_leaveledgerentry
+        (employee_id, leave_type, year, kind, days, leave_id, note, created_at)
+    SELECT employee_id, leave_type, year,
+           CASE WHEN coalesce(w.days, 0) > coalesce(p.days, 0) THEN 'consumption' ELSE 'reversal' END,
+           coalesce(p.days, 0) - coalesce(w.days, 0),
+           leave_id, %(note)s, now()
+    FROM wanted w
+    FULL JOIN posted p USING (leave_id, employee_id, leave_type, year)
+    WHERE coalesce(w.days, 0) <> coalesce(p.days, 0)
+    RETURNING employee_id, leave_type, year, kind, days
+)
+""" + UPSERT_BALANCES
+
+ACCRUE = """
+WITH entries AS (
+    INSERT INTO core_leaveledgerentry
+        (employee_id, leave_type, year, kind, days, leave_id, note, created_at)
+    SELECT e.id, t.leave_type, %(year)s, 'accrual', t.days, NULL, %(note)s, now()
+    FROM core_employee e
+    CROSS JOIN unnest(%(leave_types)s::varchar[], %(days)s::numeric[]) AS t(leave_type, days)
+    WHERE %(everyone)s OR e.id = ANY(%(employee_ids)s)
+    ON CONFLICT (employee_id, leave_type, year) WHERE kind = 'accrual' DO NOTHING
+    RETURNING employee_id, leave_type, year, kind, days
+)
+""" + UPSERT_BALANCES
+
+REBUILD_BALANCES = """
+INSERT INTO core_leavebalance (employee_id, leave_type, year, accrued, used, updated_at)
+SELECT employee_id, leave_type, year,
+       coalesce(sum(days) FILTER (WHERE kind IN ('accrual', 'adjustment')), 0),
+       coalesce(-sum(days) FILTER (WHERE kind IN ('consumption', 'reversal')), 0),
+       now()
+FROM core_leaveledgerentry
+GROUP BY 1, 2, 3
+ON CONFLICT (employee_id, leave_type, year) DO UPDATE
+SET accrued = EXCLUDED.accrued, used = EXCLUDED.used, updated_at = EXCLUDED.updated_at
+WHERE (core_leavebalance.accrued, core_leavebalance.used)
+      IS DISTINCT FROM (EXCLUDED.accrued, EXCLUDED.used)
+"""
+
+DELETE_EMPTY_BALANCES = """
+DELETE FROM core_leavebalance b
+WHERE NOT EXISTS (
+    SELECT 1 FROM core_leaveledgerentry x
+    WHERE x.employee_id = b.employee_id AND x.leave_type = b.leave_type AND x.year = b.year
+)
+"""
+
+
+def days_by_year(start_date, end_date):
+    """Split ``start_date``..``end_date`` into ``{year: days}``"""
+    days = {}
+    while start_date <= end_date:
+        year_end = min(end_date, date(start_date.year, 12, 31))
+        days[start_date.year] = (year_end - start_date).days + 1
+        start_date = year_end + timedelta(days=1)
+    return days
+
+
+def post_leaves(leave_ids=None, note=''):
+    """Bring the ledger in line with the given leaves (or all of them).
+
+    Approved leaves consume their days; leaves that were rejected, edited or
+    deleted since their days were consumed get the difference back. Returns
+    the number of balances changed.
+    """
+    params = {
+        'everyone': leave_ids is None,
+        'leave_ids': list(leave_ids or []),
+        'note': note,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(POST_LEAVES, params)
+        return cursor.rowcount
+
+
+def accrue(year, employee_ids=None):
+    """Credit the yearly entitlements to everyone or the given employees.
+
+    Employees who already received the year's accrual for a type are skipped.
+    Returns the number of balances changed.
+    """
+    entitlements = settings.LEAVE_ENTITLEMENTS
+    params = {
+        'year': year,
+        'leave_types': list(entitlements),
+        'days': list(entitlements.values()),
+        'everyone': employee_ids is None,
+        'employee_ids': list(employee_ids or []),
+        'note': f'Entitlement {year}',
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(ACCRUE, params)
+        changed = cursor.rowcount
+    if changed:
+        bump_version('leave')
+    return changed
+
+
+def rebuild_balances():
+    """Recompute every balance from the ledger; returns ``(fixed, removed)``"""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # Hold off new entries so none is counted twice or missed
+            cursor.execute('LOCK TABLE core_leaveledgerentry IN SHARE MODE')
+            cursor.execute(REBUILD_BALANCES)
+            fixed = cursor.rowcount
+            cursor.execute(DELETE_EMPTY_BALANCES)
+            removed = cursor.rowcount
+    if fixed or removed:
+        bump_version('leave')
+    return fixed, removed
+
+
+def remaining_days(employee_id, leave_type, year, leave=None):
+    """Days of ``leave_type`` the employee has left in ``year``.
+
+    Days already consumed by ``leave`` count as available, since editing it
+    gives them back first. A year without an accrual yet, such as next year
+    before ``accrue_leave`` runs, counts the entitlement it will receive.
+    """
+    balance = LeaveBalance.objects.filter(
+        employee_id=employee_id, leave_type=leave_type, year=year
+    ).first()
+    remaining = balance.remaining if balance else 0
+    accrued = balance is not None and LeaveLedgerEntry.objects.filter(
+        employee_id=employee_id, leave_type=leave_type, year=year, kind='accrual',
+    ).exists()
+    if not accrued:
+        remaining += settings.LEAVE_ENTITLEMENTS.get(leave_type, 0)
+    if leave is not None and leave.pk and leave.status == 'approved':
+        consumed = LeaveLedgerEntry.objects.filter(
+            leave=leave, employee_id=employee_id, leave_type=leave_type, year=year,
+        ).aggregate(days=Sum('days'))['days']
+        remaining -= consumed or 0
+    return remaining
+
+
+def check_balance(employee_id, leave_type, start_date, end_date, leave=None):
+    """Raise ValidationError if the leave needs more days than are left in a year it touches"""
+    if leave_type not in settings.LEAVE_ENTITLEMENTS:
+        return
+    errors = []
+    for year, days in days_by_year(start_date, end_date).items():
+        remaining = remaining_days(employee_id, leave_type, year, leave=leave)
+        if days > remaining:
+            errors.append(ValidationError(
+                f'Only {float(remaining):g} days of {leave_type} leave left in {year}; '
+                f'this leave needs {days}.',
+                code='insufficient_balance',
+            ))
+    if errors:
+        raise ValidationError(errors)
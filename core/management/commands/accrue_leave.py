@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import ledger
+
+
+class Command(BaseCommand):
+    help = "Credit each employee's yearly leave entitlements (safe to run repeatedly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Calendar year to credit (default: the current one)')
+        parser.add_argument(
+            '--employee',
+            type=int,
+            action='append',
+            dest='employee_ids',
+            help='Only credit this employee id (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        year = options['year'] or timezone.localdate().year
+        changed = ledger.accrue(year, options['employee_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Credited {year} entitlements to {changed} balances.'))
@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import audit
+from core.models import Shift, ShiftArchive
+
+
+class Command(BaseCommand):
+    help = 'Move finished shifts older than the archive horizon into the archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.SHIFT_ARCHIVE_HORIZON_DAYS,
+            help='Archive shifts that ended more than this many days ago',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of shifts moved per transaction',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many shifts would be archived',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        finished = Shift.objects.filter(end_time__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f'{finished.count()} shifts would be archived (ended before {cutoff:%Y-%m-%d}).')
+            return
+
+        moved = 0
+        while True:
+            # One audit INSERT per batch rather than per deleted shift
+            with audit.buffered():
+                batch = ShiftArchive.archive_batch(finished, options['batch_size'])
+            if not batch:
+                break
+            moved += batch
+            self.stdout.write(f'Archived {moved} shifts...')
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} shifts that ended before {cutoff:%Y-%m-%d}.'))
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.audit import create_partitions, drop_partitions
+
+
+class Command(BaseCommand):
+    help = 'Create the monthly audit trail partitions ahead of time and drop those past retention'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=settings.AUDIT_PARTITIONS_AHEAD,
+            help='Months after the current one to create partitions for',
+        )
+        parser.add_argument(
+            '--retention',
+            type=int,
+            default=settings.AUDIT_RETENTION_MONTHS,
+            help='Drop partitions older than this many months (0 keeps everything)',
+        )
+
+    def handle(self, *args, **options):
+        for name in create_partitions(options['ahead']):
+            self.stdout.write(f'Created {name}')
+        for name in drop_partitions(options['retention']):
+            self.stdout.write(f'Dropped {name}')
+        self.stdout.write(self.style.SUCCESS('Audit trail partitions are up to date.'))
@@ -0,0 +1,100 @@
+import json
+import random
+from datetime import timedelta
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Employee, Punch, Shift
+
+BENCH_TOKEN = 'bench-terminal-token'
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the punch endpoint in-process against throwaway employees and shifts '
+        '(rolled back afterwards) and report sustained punches per second'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--punches', type=int, default=20000, help='Total punches to send')
+        parser.add_argument('--batch-size', type=int, default=200, help='Punches per request')
+        parser.add_argument('--employees', type=int, default=500, help='Employees punching')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            payloads = self.build_payloads(options['employees'], options['punches'], options['batch_size'])
+            client = Client()
+            url = reverse('core:punch')
+
+            with override_settings(ATTENDANCE_TERMINAL_TOKENS=[BENCH_TOKEN]):
+                started = perf_counter()
+                for payload in payloads:
+                    self.post(client, url, payload)
+                elapsed = perf_counter() - started
+
+                # Terminals retry whole batches when an ack is lost
+                retry_started = perf_counter()
+                self.post(client, url, payloads[0])
+                retry_elapsed = perf_counter() - retry_started
+
+            stored = Punch.objects.filter(terminal__startswith='bench-').count()
+            matched = Punch.objects.filter(terminal__startswith='bench-', shift__isnull=False).count()
+            transaction.set_rollback(True)
+
+        sent = sum(len(payload) for payload in payloads)
+        self.stdout.write(f'Sent {sent} punches in {len(payloads)} requests of {options["batch_size"]}')
+        self.stdout.write(f'Elapsed: {elapsed:.2f}s ({sent / elapsed:,.0f} punches/s, '
+                          f'{elapsed / len(payloads) * 1000:.1f} ms/request)')
+        self.stdout.write(f'Stored: {stored} (matched to a shift: {matched})')
+        self.stdout.write(f'Retried batch of {len(payloads[0])}: {retry_elapsed * 1000:.1f} ms, '
+                          f'no duplicates: {stored == sent}')
+
+    def post(self, client, url, payload):
+        response = client.post(
+            url, json.dumps(payload), content_type='application/json',
+            HTTP_X_TERMINAL_TOKEN=BENCH_TOKEN,
+        )
+        if response.status_code != 200 or response.json()['errors']:
+            raise RuntimeError(f'Punch request failed: {response.status_code} {response.content[:200]!r}')
+
+    def build_payloads(self, employee_count, punch_count, batch_size):
+        """Create throwaway employees with today's shifts and a punch stream around them"""
+        now = timezone.now().replace(minute=0, second=0, microsecond=0)
+        users = User.objects.bulk_create(
+            User(username=f'bench-{i}-{now:%H%M%S}') for i in range(employee_count)
+        )
+        employees = Employee.objects.bulk_create(
+            Employee(user=user, name=user.username, email=f'{user.username}@bench.invalid')
+            for user in users
+        )
+        shifts = Shift.objects.bulk_create(
+            Shift(name=f'Bench {hour}', start_time=now + timedelta(hours=hour),
+                  end_time=now + timedelta(hours=hour + 8))
+            for hour in range(0, 24, 8)
+        )
+        Assignment = Shift.employees.through
+        Assignment.objects.bulk_create(
+            Assignment(shift_id=shifts[i % len(shifts)].pk, employee_id=employee.pk)
+            for i, employee in enumerate(employees)
+        )
+
+        punches = []
+        for i in range(punch_count):
+            index = i % employee_count
+            shift = shifts[index % len(shifts)]
+            punch_type = 'in' if (i // employee_count) % 2 == 0 else 'out'
+            boundary = shift.start_time if punch_type == 'in' else shift.end_time
+            punches.append({
+                'employee': employees[index].pk,
+                'punch_type': punch_type,
+                'punched_at': (boundary + timedelta(minutes=random.randint(-20, 20))).isoformat(),
+                'terminal': f'bench-{index % 50}',
+                'punch_id': f'{i}',
+            })
+        return [punches[i:i + batch_size] for i in range(0, len(punches), batch_size)]
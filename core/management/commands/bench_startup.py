@@ -0,0 +1,200 @@
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from http.client import HTTPConnection
+from pathlib import Path
+from statistics import median
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# "import time: <self us> | <cumulative us> | <nested module name>"
+IMPORT_TIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)')
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the import time of the WSGI app, then start gunicorn with gunicorn.conf.py '
+        'and report time to first request, first-request latencies and memory per worker'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Gunicorn workers to start')
+        parser.add_argument('--requests', type=int, default=40, help='Requests sent once the server answers')
+        parser.add_argument('--path', default='/', help='Path requested')
+        parser.add_argument('--timeout', type=float, default=60, help='Seconds to wait for the server')
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Also start without preloading, to compare with the default preloaded mode',
+        )
+
+    def handle(self, *args, **options):
+        config = Path(settings.BASE_DIR) / 'gunicorn.conf.py'
+        if not config.exists():
+            raise CommandError(f'{config} not found.')
+
+        self.report_import_time()
+        modes = [True, False] if options['compare'] else [True]
+        for preload in modes:
+            self.stdout.write('')
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'gunicorn, {options["workers"]} workers, preload {"on" if preload else "off"}'
+            ))
+            self.report_startup(config, preload, options)
+
+    def report_import_time(self):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import shift_management.wsgi'],
+            cwd=settings.BASE_DIR,
+            env=self.environment(),
+            capture_output=True,
+            text=True,
+        )
+        elapsed = time.perf_counter() - started
+        if result.returncode:
+            raise CommandError(f'Importing the WSGI app failed:\n{result.stderr[-2000:]}')
+
+        # Time spent in each package's own modules, excluding what they import
+        packages = defaultdict(int)
+        for line in result.stderr.splitlines():
+            match = IMPORT_TIME_LINE.match(line)
+            if match:
+                packages[match.group(2).split('.')[0]] += int(match.group(1))
+        total = sum(packages.values())
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Importing shift_management.wsgi'))
+        self.stdout.write(f'Process wall time: {elapsed * 1000:.0f} ms, imports: {total / 1000:.0f} ms')
+        for package, micros in sorted(packages.items(), key=lambda item: -item[1])[:10]:
+            self.stdout.write(f'  {package:<24} {micros / 1000:8.1f} ms')
+
+    def report_startup(self, config, preload, options):
+        port = free_port()
+        env = self.environment(GUNICORN_PRELOAD='1' if preload else '0', GUNICORN_ACCESSLOG=os.devnull)
+        # A file rather than a pipe: nothing reads the log while the server
+        # runs, and a full pipe would block gunicorn
+        log = tempfile.TemporaryFile('w+')
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn',
+                '--config', str(config),
+                '--bind', f'127.0.0.1:{port}',
+                '--workers', str(options['workers']),
+            ],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=log,
+        )
+        try:
+            first = self.wait_for_first_response(server, log, port, options['path'], started, options['timeout'])
+            latencies = [request(port, options['path'])[1] for _ in range(options['requests'])]
+            workers = wait_for_children(server.pid, options['workers'], options['timeout'])
+            memory = {pid: memory_usage(pid) for pid in [server.pid, *workers]}
+        finally:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+            log.close()
+
+        self.stdout.write(f'Time to first response: {first * 1000:.0f} ms')
+        if latencies:
+            self.stdout.write(
+                f'Next {len(latencies)} requests: median {median(latencies) * 1000:.1f} ms, '
+                f'slowest {max(latencies) * 1000:.1f} ms'
+            )
+        if memory[server.pid] is None:
+            self.stdout.write('Memory: unavailable (needs Linux /proc/<pid>/smaps_rollup)')
+            return
+        self.stdout.write(f'{"process":<16}{"RSS MiB":>10}{"PSS MiB":>10}{"private MiB":>13}')
+        for pid, usage in memory.items():
+            label = f'master {pid}' if pid == server.pid else f'worker {pid}'
+            self.stdout.write(
+                f'{label:<16}{usage["rss"] / 1024:>10.1f}{usage["pss"] / 1024:>10.1f}'
+                f'{usage["private"] / 1024:>13.1f}'
+            )
+        worker_usage = [memory[pid] for pid in workers]
+        if worker_usage:
+            self.stdout.write(
+                f'Per worker: RSS {sum(u["rss"] for u in worker_usage) / len(worker_usage) / 1024:.1f} MiB, '
+                f'private {sum(u["private"] for u in worker_usage) / len(worker_usage) / 1024:.1f} MiB; '
+                f'all processes: PSS {sum(u["pss"] for u in memory.values()) / 1024:.1f} MiB'
+            )
+
+    def wait_for_first_response(self, server, log, port, path, started, timeout):
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                log.seek(0)
+                raise CommandError(f'gunicorn exited with {server.returncode}:\n{log.read()[-2000:]}')
+            try:
+                request(port, path)
+            except OSError:
+                time.sleep(0.01)
+                continue
+            return time.perf_counter() - started
+        raise CommandError(f'gunicorn did not answer within {timeout:.0f}s.')
+
+    def environment(self, **extra):
+        env = {**os.environ, **extra}
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'shift_management.settings')
+        return env
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def request(port, path):
+    """One GET without following redirects; returns ``(status, seconds)``"""
+    started = time.perf_counter()
+    connection = HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+    finally:
+        connection.close()
+    return response.status, time.perf_counter() - started
+
+
+def wait_for_children(pid, count, timeout):
+    """Pids of the master's worker processes, once all of them have been forked"""
+    children_file = Path(f'/proc/{pid}/task/{pid}/children')
+    deadline = time.perf_counter() + timeout
+    children = []
+    while children_file.exists() and time.perf_counter() < deadline:
+        children = [int(child) for child in children_file.read_text().split()]
+        if len(children) >= count:
+            break
+        time.sleep(0.05)
+    return children
+
+
+def memory_usage(pid):
+    """RSS, PSS and private memory of a process in KiB, or ``None`` off Linux"""
+    try:
+        text = Path(f'/proc/{pid}/smaps_rollup').read_text()
+    except OSError:
+        return None
+    values = {}
+    for line in text.splitlines():
+        name, _, rest = line.partition(':')
+        if rest.strip().endswith('kB'):
+            values[name] = int(rest.split()[0])
+    return {
+        'rss': values.get('Rss', 0),
+        'pss': values.get('Pss', 0),
+        'private': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0),
+    }
@@ -0,0 +1,62 @@
+import subprocess
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template.utils import get_app_template_dirs
+
+
+class Command(BaseCommand):
+    help = (
+        'Compile the Tailwind stylesheet into a purged, minified static/css/app.css. '
+        'Run it after changing templates, before collectstatic.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='Keep running and rebuild when templates change',
+        )
+
+    def handle(self, *args, **options):
+        source = Path(settings.TAILWIND_INPUT_CSS)
+        output = Path(settings.TAILWIND_OUTPUT_CSS)
+        output.parent.mkdir(parents=True, exist_ok=True)
+
+        # The entry file only knows about our own templates; third-party
+        # template packs (crispy_tailwind) live in site-packages, so their
+        # locations are added at build time.
+        extra_sources = ''.join(
+            f'@source "{directory.as_posix()}";\n' for directory in self.third_party_template_dirs()
+        )
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.css', dir=source.parent, encoding='utf-8', delete=False
+        ) as entry:
+            entry.write(source.read_text(encoding='utf-8') + '\n' + extra_sources)
+
+        command = [settings.TAILWIND_CLI, '--input', entry.name, '--output', str(output), '--minify']
+        if options['watch']:
+            command.append('--watch')
+        try:
+            subprocess.run(command, check=True)
+        except FileNotFoundError:
+            raise CommandError(
+                f'Tailwind CLI "{settings.TAILWIND_CLI}" not found. '
+                'Install the tailwindcss-bin dev dependency (uv sync, or pip install -r requirements-dev.txt) '
+                'or set TAILWIND_CLI.'
+            )
+        except subprocess.CalledProcessError as exc:
+            raise CommandError(f'Tailwind build failed with exit code {exc.returncode}.')
+        finally:
+            Path(entry.name).unlink()
+
+        self.stdout.write(self.style.SUCCESS(f'Built {output} ({output.stat().st_size} bytes).'))
+
+    def third_party_template_dirs(self):
+        return [
+            directory
+            for directory in get_app_template_dirs('templates')
+            if 'crispy_tailwind' in directory.parts
+        ]
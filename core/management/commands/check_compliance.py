@@ -0,0 +1,43 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.compliance import check
+from core.models import ComplianceViolation
+
+
+class Command(BaseCommand):
+    help = 'Check shifts against the labor rules and store the violations found'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employee',
+            type=int,
+            action='append',
+            dest='employee_ids',
+            help='Only re-check this employee id (repeatable)',
+        )
+        parser.add_argument(
+            '--since',
+            help='Check shifts ending on or after this date (YYYY-MM-DD) instead of the lookback window',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format.')
+
+        started = time.perf_counter()
+        found = check(options['employee_ids'], since=since)
+        elapsed = time.perf_counter() - started
+
+        labels = dict(ComplianceViolation.RULE_CHOICES)
+        for rule, count in found.items():
+            self.stdout.write(f'{rule} ({labels[rule]}): {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Found {sum(found.values())} violations in {elapsed:.2f}s.'
+        ))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import ledger
+
+
+class Command(BaseCommand):
+    help = 'Post missing leave consumption to the ledger and rebuild every leave balance from it'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        posted = ledger.post_leaves(note='Reconciliation')
+        fixed, removed = ledger.rebuild_balances()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'Balances changed by missing ledger entries: {posted}')
+        self.stdout.write(f'Balances corrected from the ledger: {fixed}')
+        self.stdout.write(f'Empty balances removed: {removed}')
+        self.stdout.write(self.style.SUCCESS(f'Reconciled leave balances in {elapsed:.2f}s.'))
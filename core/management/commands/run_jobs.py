@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import jobqueue
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs; start several to work in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of polling for new jobs',
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=None,
+            help='Exit after running this many jobs',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.JOB_POLL_INTERVAL_SECONDS,
+            help='Seconds to wait before checking an empty queue again',
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        try:
+            while options['max_jobs'] is None or processed < options['max_jobs']:
+                close_old_connections()
+                requeued = jobqueue.requeue_stale()
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale jobs.'))
+
+                job = jobqueue.claim()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                self.stdout.write(f'Running {job} (attempt {job.attempts}/{job.max_attempts})...')
+                if jobqueue.run(job):
+                    self.stdout.write(self.style.SUCCESS(f'{job} finished.'))
+                else:
+                    self.stdout.write(self.style.ERROR(f'{job} failed.'))
+                processed += 1
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping worker.')
+
+        self.stdout.write(f'Processed {processed} jobs.')
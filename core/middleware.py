@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from . import audit
+from .models import Employee
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    """Drop a cached user (and the employee profile cached with it)"""
+    cache.delete(user_cache_key(user_id))
+
+
+def get_cached_user(request):
+    """Resolve request.user from the cache, falling back to the database"""
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = _load_user(request)
+    return request._cached_user
+
+
+def _load_user(request):
+    try:
+        user_id = request.session[SESSION_KEY]
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+    if user is not None:
+        # Same session verification auth.get_user() does, without the query.
+        # A mismatch may still be valid under SECRET_KEY_FALLBACKS, so let
+        # the regular lookup decide.
+        session_hash = request.session.get(HASH_SESSION_KEY)
+        if session_hash and constant_time_compare(session_hash, user.get_session_auth_hash()):
+            user.backend = backend_path
+            return user
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        # Cache the profile (or its absence) on the user so views reading
+        # request.user.employee_profile don't query either.
+        try:
+            user.employee_profile
+        except Employee.DoesNotExist:
+            pass
+        cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware that serves request.user from the cache"""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
+
+
+class AuditMiddleware:
+    """Collects the request's audit entries and writes them once the response is sent"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        audit.start(getattr(request, 'user', None))
+        response = self.get_response(request)
+        # Closers run when the server closes the response, after the body
+        # went out, so the INSERT doesn't delay the client
+        response._resource_closers.append(audit.flush)
+        return response
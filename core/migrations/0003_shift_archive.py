@@ -0,0 +1,58 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_leave"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShiftArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("start_time", models.DateTimeField()),
+                ("end_time", models.DateTimeField()),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["start_time"],
+                "abstract": False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name="shift",
+            index=models.Index(fields=["start_time"], name="shift_start_time_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="shift",
+            index=models.Index(fields=["end_time"], name="shift_end_time_idx"),
+        ),
+        migrations.AddField(
+            model_name="shiftarchive",
+            name="employees",
+            field=models.ManyToManyField(
+                blank=True, related_name="archived_shifts", to="core.employee"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="shiftarchive",
+            index=models.Index(
+                fields=["start_time"], name="shiftarchive_start_time_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,140 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:40
+
+import datetime
+
+import core.models
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+def merge_consecutive_days(apps, schema_editor):
+    """Collapse runs of one-day leaves into a single date-range row"""
+    Leave = apps.get_model("core", "Leave")
+    run = None
+    merged_ids = []
+    for leave in Leave.objects.order_by(
+        "employee_id", "leave_type", "status", "date"
+    ).iterator():
+        if (
+            run is not None
+            and (run.employee_id, run.leave_type, run.status)
+            == (leave.employee_id, leave.leave_type, leave.status)
+            and leave.date == run.end_date + datetime.timedelta(days=1)
+        ):
+            run.end_date = leave.date
+            if not run.reason:
+                run.reason = leave.reason
+            merged_ids.append(leave.pk)
+            continue
+        if run is not None:
+            run.save(update_fields=["start_date", "end_date", "reason"])
+        run = leave
+        run.start_date = run.end_date = leave.date
+    if run is not None:
+        run.save(update_fields=["start_date", "end_date", "reason"])
+    Leave.objects.filter(pk__in=merged_ids).delete()
+
+
+def split_into_days(apps, schema_editor):
+    """Expand date-range leaves back into one row per day"""
+    Leave = apps.get_model("core", "Leave")
+    extra_days = []
+    for leave in Leave.objects.iterator():
+        leave.date = leave.start_date
+        leave.save(update_fields=["date"])
+        day = leave.start_date + datetime.timedelta(days=1)
+        while day <= leave.end_date:
+            extra_days.append(
+                Leave(
+                    employee_id=leave.employee_id,
+                    date=day,
+                    leave_type=leave.leave_type,
+                    reason=leave.reason,
+                    status=leave.status,
+                    approved_by_id=leave.approved_by_id,
+                    approved_at=leave.approved_at,
+                )
+            )
+            day += datetime.timedelta(days=1)
+    Leave.objects.bulk_create(extra_days, batch_size=1000)
+    # Flush deferred FK checks so the following ALTER TABLEs can run
+    schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_shift_archive"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="leave",
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name="leave",
+            name="start_date",
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name="leave",
+            name="end_date",
+            field=models.DateField(null=True),
+        ),
+        migrations.AlterField(
+            model_name="leave",
+            name="date",
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(merge_consecutive_days, split_into_days),
+        migrations.RemoveField(
+            model_name="leave",
+            name="date",
+        ),
+        migrations.AlterField(
+            model_name="leave",
+            name="start_date",
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name="leave",
+            name="end_date",
+            field=models.DateField(),
+        ),
+        migrations.AlterModelOptions(
+            name="leave",
+            options={"ordering": ["-start_date"]},
+        ),
+        BtreeGistExtension(),
+        migrations.AddConstraint(
+            model_name="leave",
+            constraint=models.CheckConstraint(
+                condition=models.Q(("end_date__gte", models.F("start_date"))),
+                name="leave_end_date_after_start_date",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="leave",
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(
+                condition=models.Q(("status", "rejected"), _negated=True),
+                expressions=[
+                    (
+                        core.models.DateRange(
+                            "start_date",
+                            "end_date",
+                            django.contrib.postgres.fields.ranges.RangeBoundary(
+                                inclusive_upper=True
+                            ),
+                        ),
+                        "&&",
+                    ),
+                    ("employee", "="),
+                ],
+                name="leave_no_overlap",
+                violation_error_message="This employee already has a leave in this period.",
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_leave_date_range"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Punch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "punch_type",
+                    models.CharField(
+                        choices=[("in", "ورود"), ("out", "خروج")], max_length=3
+                    ),
+                ),
+                ("punched_at", models.DateTimeField()),
+                ("terminal", models.CharField(max_length=50)),
+                ("punch_id", models.CharField(max_length=64)),
+                ("deviation_minutes", models.IntegerField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "employee",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="punches",
+                        to="core.employee",
+                    ),
+                ),
+                (
+                    "shift",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="punches",
+                        to="core.shift",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-punched_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["employee", "punched_at"],
+                        name="punch_employee_time_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("terminal", "punch_id"),
+                        name="punch_unique_per_terminal",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:05
+
+import core.models
+from django.db import migrations, models
+
+
+def fill_calendar_tokens(apps, schema_editor):
+    Employee = apps.get_model("core", "Employee")
+    for employee in Employee.objects.filter(calendar_token__isnull=True).iterator():
+        employee.calendar_token = core.models.new_calendar_token()
+        employee.save(update_fields=["calendar_token"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="employee",
+            name="calendar_token",
+            field=models.CharField(editable=False, max_length=32, null=True),
+        ),
+        migrations.RunPython(fill_calendar_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="employee",
+            name="calendar_token",
+            field=models.CharField(
+                default=core.models.new_calendar_token,
+                editable=False,
+                max_length=32,
+                unique=True,
+            ),
+        ),
+    ]
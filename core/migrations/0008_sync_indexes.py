@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_employee_calendar_token"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="employee",
+            index=models.Index(
+                fields=["updated_at", "id"], name="employee_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="leave",
+            index=models.Index(fields=["updated_at", "id"], name="leave_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="shift",
+            index=models.Index(fields=["updated_at", "id"], name="shift_updated_idx"),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_sync_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ComplianceViolation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "rule",
+                    models.CharField(
+                        choices=[
+                            ("weekly_hours", "بیش از ساعات کاری هفتگی"),
+                            ("min_rest", "استراحت ناکافی بین شیفت\u200cها"),
+                            ("consecutive_days", "روزهای کاری متوالی بیش از حد"),
+                            ("leave_overlap", "شیفت در روز مرخصی"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("period_start", models.DateField()),
+                ("period_end", models.DateField()),
+                ("value", models.FloatField()),
+                ("threshold", models.FloatField()),
+                ("detected_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "employee",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="compliance_violations",
+                        to="core.employee",
+                    ),
+                ),
+                (
+                    "shift",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="compliance_violations",
+                        to="core.shift",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-period_start", "employee_id"],
+                "indexes": [
+                    models.Index(
+                        fields=["employee", "period_end"], name="violation_employee_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:53
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_assigned(apps, schema_editor):
+    """Same count as ShiftQuerySet.refresh_assigned_counts, for existing shifts"""
+    Shift = apps.get_model("core", "Shift")
+    Leave = apps.get_model("core", "Leave")
+    on_leave = Leave.objects.filter(
+        status="approved",
+        employee_id=OuterRef("employee_id"),
+        start_date__lte=OuterRef("shift__end_time__date"),
+        end_date__gte=OuterRef("shift__start_time__date"),
+    )
+    available = (
+        Shift.employees.through.objects.filter(shift_id=OuterRef("pk"))
+        .filter(~Exists(on_leave))
+        .order_by()
+        .values("shift_id")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    Shift.objects.update(assigned_count=Coalesce(Subquery(available), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_compliance_violation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="shift",
+            name="assigned_count",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="shift",
+            name="required_headcount",
+            field=models.PositiveSmallIntegerField(
+                default=1, validators=[django.core.validators.MinValueValidator(1)]
+            ),
+        ),
+        migrations.RunPython(count_assigned, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="shift",
+            index=models.Index(
+                condition=models.Q(
+                    ("assigned_count__lt", models.F("required_headcount"))
+                ),
+                fields=["start_time"],
+                name="shift_understaffed_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,193 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+# Days already taken by approved leaves, per calendar year
+CONSUMPTION = """
+INSERT INTO core_leaveledgerentry
+    (employee_id, leave_type, year, kind, days, leave_id, note, created_at)
+SELECT l.employee_id, l.leave_type, y.year, 'consumption',
+       -(least(l.end_date, make_date(y.year, 12, 31))
+         - greatest(l.start_date, make_date(y.year, 1, 1)) + 1),
+       l.id, 'Opening balance', now()
+FROM core_leave l
+CROSS JOIN LATERAL generate_series(
+    extract(year FROM l.start_date)::integer, extract(year FROM l.end_date)::integer
+) AS y(year)
+WHERE l.status = 'approved'
+"""
+
+ACCRUAL = """
+INSERT INTO core_leaveledgerentry
+    (employee_id, leave_type, year, kind, days, leave_id, note, created_at)
+SELECT e.id, t.leave_type, %s, 'accrual', t.days, NULL, %s, now()
+FROM core_employee e
+CROSS JOIN unnest(%s::varchar[], %s::numeric[]) AS t(leave_type, days)
+"""
+
+BALANCES = """
+INSERT INTO core_leavebalance (employee_id, leave_type, year, accrued, used, updated_at)
+SELECT employee_id, leave_type, year,
+       coalesce(sum(days) FILTER (WHERE kind IN ('accrual', 'adjustment')), 0),
+       coalesce(-sum(days) FILTER (WHERE kind IN ('consumption', 'reversal')), 0),
+       now()
+FROM core_leaveledgerentry
+GROUP BY 1, 2, 3
+"""
+
+
+def open_ledger(apps, schema_editor):
+    """Post past approved leaves and this year's entitlements, then sum them up"""
+    year = timezone.localdate().year
+    entitlements = settings.LEAVE_ENTITLEMENTS
+    schema_editor.execute(CONSUMPTION)
+    schema_editor.execute(
+        ACCRUAL,
+        params=[year, f"Entitlement {year}", list(entitlements), list(entitlements.values())],
+    )
+    schema_editor.execute(BALANCES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_shift_headcount"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaveBalance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "leave_type",
+                    models.CharField(
+                        choices=[
+                            ("annual", "مرخصی سالانه"),
+                            ("sick", "مرخصی استعلاجی"),
+                            ("personal", "مرخصی شخصی"),
+                            ("other", "سایر"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("year", models.PositiveSmallIntegerField()),
+                (
+                    "accrued",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=7),
+                ),
+                (
+                    "used",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=7),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "employee",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="leave_balances",
+                        to="core.employee",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["employee_id", "-year", "leave_type"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("employee", "leave_type", "year"),
+                        name="leave_balance_unique",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="LeaveLedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "leave_type",
+                    models.CharField(
+                        choices=[
+                            ("annual", "مرخصی سالانه"),
+                            ("sick", "مرخصی استعلاجی"),
+                            ("personal", "مرخصی شخصی"),
+                            ("other", "سایر"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("year", models.PositiveSmallIntegerField()),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("accrual", "تخصیص"),
+                            ("consumption", "استفاده"),
+                            ("reversal", "برگشت"),
+                            ("adjustment", "اصلاح"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("days", models.DecimalField(decimal_places=2, max_digits=7)),
+                ("note", models.CharField(blank=True, max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "employee",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="leave_ledger",
+                        to="core.employee",
+                    ),
+                ),
+                (
+                    "leave",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="ledger_entries",
+                        to="core.leave",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "leave ledger entries",
+                "ordering": ["-created_at", "-id"],
+                "indexes": [
+                    models.Index(
+                        fields=["employee", "leave_type", "year"],
+                        name="ledger_balance_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("kind", "accrual")),
+                        fields=("employee", "leave_type", "year"),
+                        name="ledger_one_accrual_per_year",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_leave_ledger"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="leave",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name="shift",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
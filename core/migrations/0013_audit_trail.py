@@ -0,0 +1,119 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:30
+
+from datetime import date
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+# Partitioned by month of created_at, so created_at is part of the primary key
+CREATE_TABLE = """
+CREATE TABLE core_auditentry (
+    id bigint GENERATED BY DEFAULT AS IDENTITY,
+    created_at timestamp with time zone NOT NULL,
+    actor_id integer NULL,
+    object_type varchar(20) NOT NULL,
+    object_id bigint NOT NULL,
+    action varchar(10) NOT NULL,
+    changes jsonb NOT NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE core_auditentry_default PARTITION OF core_auditentry DEFAULT;
+CREATE INDEX audit_object_idx ON core_auditentry (object_type, object_id, created_at DESC, id DESC);
+"""
+
+
+def month_start(day, offset):
+    months = day.year * 12 + day.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def create_partitions(apps, schema_editor):
+    """This month's partition and AUDIT_PARTITIONS_AHEAD more"""
+    today = django.utils.timezone.now().date()
+    for offset in range(settings.AUDIT_PARTITIONS_AHEAD + 1):
+        start, end = month_start(today, offset), month_start(today, offset + 1)
+        schema_editor.execute(
+            f"CREATE TABLE core_auditentry_p{start:%Y%m} PARTITION OF core_auditentry "
+            f"FOR VALUES FROM ('{start.isoformat()} 00:00+00') TO ('{end.isoformat()} 00:00+00')"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_edit_versions"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(CREATE_TABLE, "DROP TABLE core_auditentry"),
+                migrations.RunPython(create_partitions, migrations.RunPython.noop),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name="AuditEntry",
+                    fields=[
+                        (
+                            "id",
+                            models.BigAutoField(
+                                auto_created=True,
+                                primary_key=True,
+                                serialize=False,
+                                verbose_name="ID",
+                            ),
+                        ),
+                        ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                        ("object_type", models.CharField(max_length=20)),
+                        ("object_id", models.BigIntegerField()),
+                        (
+                            "action",
+                            models.CharField(
+                                choices=[
+                                    ("create", "ایجاد"),
+                                    ("update", "ویرایش"),
+                                    ("delete", "حذف"),
+                                    ("assign", "تخصیص کارمند"),
+                                    ("unassign", "لغو تخصیص"),
+                                ],
+                                max_length=10,
+                            ),
+                        ),
+                        (
+                            "changes",
+                            models.JSONField(
+                                default=dict,
+                                encoder=django.core.serializers.json.DjangoJSONEncoder,
+                            ),
+                        ),
+                        (
+                            "actor",
+                            models.ForeignKey(
+                                blank=True,
+                                db_constraint=False,
+                                db_index=False,
+                                null=True,
+                                on_delete=django.db.models.deletion.DO_NOTHING,
+                                related_name="+",
+                                to=settings.AUTH_USER_MODEL,
+                            ),
+                        ),
+                    ],
+                    options={
+                        "verbose_name_plural": "audit entries",
+                        "ordering": ["-created_at", "-id"],
+                        "indexes": [
+                            models.Index(
+                                fields=["object_type", "object_id", "-created_at", "-id"],
+                                name="audit_object_idx",
+                            )
+                        ],
+                    },
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_punch_shift_without_constraint"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="complianceviolation",
+            name="shift",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="compliance_violations",
+                to="core.shift",
+            ),
+        ),
+    ]
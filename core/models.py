@@ -1,10 +1,125 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Exists, F, Func, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateRangeField, RangeBoundary, RangeOperators
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 from django.utils import timezone
+from django.utils.crypto import get_random_string
 
 
-class Employee(models.Model):
+def new_calendar_token():
+    return get_random_string(32)
+
+
+class EditConflict(Exception):
+    """A versioned row was saved by someone else since it was read"""
+
+    def __init__(self, instance, current):
+        self.instance = instance
+        # The row as it is stored now
+        self.current = current
+        super().__init__(
+            f'{instance._meta.verbose_name.capitalize()} {instance.pk} was changed by someone else.'
+        )
+
+
+class TrackedModel(models.Model):
+    """Remembers the field values each instance was read with.
+
+    Lets saves tell what changed without reading the row again: versioned
+    saves write only those fields, and core.audit records them as a diff.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded_values()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._remember_loaded_values()
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save receivers have seen the old values by now
+        self._remember_loaded_values()
+
+    def _remember_loaded_values(self):
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname not in deferred
+        }
+
+    def changed_fields(self):
+        """Names of fields changed since the row was read, or ``None`` if it wasn't"""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return None
+        return [
+            field.name for field in self._meta.concrete_fields
+            if field.attname in loaded and getattr(self, field.attname) != loaded[field.attname]
+        ]
+
+
+class VersionedModel(TrackedModel):
+    """Optimistic concurrency control for rows edited by several people.
+
+    Saving an existing row is a compare-and-swap on ``version``: the UPDATE
+    only matches if the row still has the version this instance was read
+    with, and bumps it. Otherwise nothing is written and :class:`EditConflict`
+    is raised, so no lock is held while someone is editing. Only fields that
+    differ from the values read are written.
+    """
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            update_fields = self.changed_fields()
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'version', 'updated_at'}
+
+        expected = self._expected_version = self.version
+        self.version = expected + 1
+        try:
+            super().save(*args, **kwargs)
+        except BaseException:
+            self.version = expected
+            raise
+        finally:
+            del self._expected_version
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected = getattr(self, '_expected_version', None)
+        if expected is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        if super()._do_update(
+            base_qs.filter(version=expected), using, pk_val, values, update_fields, forced_update
+        ):
+            return True
+        current = base_qs.filter(pk=pk_val).first()
+        if current is not None:
+            raise EditConflict(self, current)
+        # Deleted meanwhile: let Django handle it as for any other model
+        return False
+
+
+class Employee(TrackedModel):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='employee_profile')
     name = models.CharField(max_length=100)
     email = models.EmailField(unique=True)
@@ -14,11 +129,17 @@ class Employee(models.Model):
         default=0.00,
         validators=[MinValueValidator(0.00)]
     )
+    # Secret part of the employee's subscribable .ics feed URL
+    calendar_token = models.CharField(max_length=32, unique=True, default=new_calendar_token, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Keyset pagination of API syncs
+            models.Index(fields=['updated_at', 'id'], name='employee_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -40,30 +161,25 @@ class Employee(models.Model):
 
     def is_on_leave_today(self):
         """Check if employee is on leave today"""
-        today = timezone.now().date()
-        return self.leaves.filter(
-            date=today,
-            status='approved'
-        ).exists()
+        today = timezone.localdate()
+        return self.leaves.approved().covering(today).exists()
 
     def get_today_leave(self):
         """Get today's leave if exists"""
-        today = timezone.now().date()
-        return self.leaves.filter(
-            date=today,
-            status='approved'
-        ).first()
+        today = timezone.localdate()
+        return self.leaves.approved().covering(today).first()
 
 
-class Shift(models.Model):
+class ShiftBase(models.Model):
+    """Fields and helpers shared by live and archived shifts"""
     name = models.CharField(max_length=100)
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
-    employees = models.ManyToManyField(Employee, related_name='shifts', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
+        abstract = True
         ordering = ['start_time']
 
     def __str__(self):
@@ -90,7 +206,153 @@ class Shift(models.Model):
         return duration.total_seconds() / 3600
 
 
-class Leave(models.Model):
+class ShiftQuerySet(models.QuerySet):
+    def upcoming(self):
+        return self.filter(start_time__gt=timezone.now())
+
+    def understaffed(self):
+        """Shifts with fewer available employees than they need"""
+        return self.filter(assigned_count__lt=F('required_headcount'))
+
+    def refresh_assigned_counts(self, touch_all=False):
+        """Recount the assigned employees who are not on approved leave during each shift.
+
+        Only shifts whose count changes are written, and they get a new
+        ``updated_at`` so ``updated_since`` syncs pick them up. With
+        ``touch_all`` every shift does, e.g. when its employees changed.
+        """
+        on_leave = Leave.objects.approved().filter(
+            employee_id=OuterRef('employee_id'),
+            start_date__lte=OuterRef('shift__end_time__date'),
+            end_date__gte=OuterRef('shift__start_time__date'),
+        )
+        available = (
+            Shift.employees.through.objects.filter(shift_id=OuterRef('pk'))
+            .filter(~Exists(on_leave))
+            .order_by()
+            .values('shift_id')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        count = Coalesce(Subquery(available), 0)
+        shifts = self if touch_all else self.exclude(assigned_count=count)
+        # Stamped like auto_now; the database's now() is the transaction
+        # start, which may be older than a save made earlier in it
+        return shifts.update(assigned_count=count, updated_at=timezone.now())
+
+
+class Shift(VersionedModel, ShiftBase):
+    employees = models.ManyToManyField(Employee, related_name='shifts', blank=True)
+    required_headcount = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)])
+    # Assigned employees who are not on approved leave; kept current by core.signals
+    assigned_count = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    objects = ShiftQuerySet.as_manager()
+
+    class Meta(ShiftBase.Meta):
+        indexes = [
+            models.Index(fields=['start_time'], name='shift_start_time_idx'),
+            models.Index(fields=['end_time'], name='shift_end_time_idx'),
+            models.Index(fields=['updated_at', 'id'], name='shift_updated_idx'),
+            # Open shifts: only understaffed rows are indexed, by start time
+            models.Index(
+                fields=['start_time'],
+                condition=Q(assigned_count__lt=F('required_headcount')),
+                name='shift_understaffed_idx',
+            ),
+        ]
+
+    def open_positions(self):
+        return max(self.required_headcount - self.assigned_count, 0)
+
+
+class ShiftArchive(ShiftBase):
+    """Finished shift moved out of the hot table by ``archive_shifts``"""
+    employees = models.ManyToManyField(Employee, related_name='archived_shifts', blank=True)
+    # Copied verbatim from the live row, so no auto_now handling here
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta(ShiftBase.Meta):
+        indexes = [
+            models.Index(fields=['start_time'], name='shiftarchive_start_time_idx'),
+        ]
+
+    @classmethod
+    def from_shift(cls, shift):
+        """Build an (unsaved) archive row that keeps the shift's primary key"""
+        return cls(
+            id=shift.id,
+            name=shift.name,
+            start_time=shift.start_time,
+            end_time=shift.end_time,
+            created_at=shift.created_at,
+            updated_at=shift.updated_at,
+        )
+
+    @classmethod
+    def archive_batch(cls, queryset, batch_size):
+        """Copy one batch of shifts and their assignments to the archive, then delete them"""
+        with transaction.atomic():
+            shifts = list(
+                queryset.select_for_update(skip_locked=True).order_by('pk')[:batch_size]
+            )
+            if not shifts:
+                return 0
+
+            shift_ids = [shift.pk for shift in shifts]
+            cls.objects.bulk_create(cls.from_shift(shift) for shift in shifts)
+
+            Assignment = Shift.employees.through
+            ArchivedAssignment = cls.employees.through
+            assignments = list(
+                Assignment.objects.filter(shift_id__in=shift_ids).values_list('shift_id', 'employee_id')
+            )
+            ArchivedAssignment.objects.bulk_create(
+                ArchivedAssignment(shiftarchive_id=shift_id, employee_id=employee_id)
+                for shift_id, employee_id in assignments
+            )
+
+            doomed = Shift.objects.filter(pk__in=shift_ids)
+            # Tells core.signals to skip the per-shift schedule updates: the
+            # whole batch's feeds are refreshed once below, and finished
+            # shifts don't need a compliance re-check
+            doomed.archiving = True
+            doomed.delete()
+
+            from .ical import invalidate_feeds  # core.ical imports this module
+
+            employee_ids = {employee_id for _, employee_id in assignments}
+            transaction.on_commit(lambda: invalidate_feeds(employee_ids))
+            return len(shifts)
+
+
+class DateRange(Func):
+    """PostgreSQL ``daterange(lower, upper, bounds)`` constructor"""
+    function = 'DATERANGE'
+    output_field = DateRangeField()
+
+
+def leave_period():
+    """Inclusive date range of a leave, as indexed by ``leave_no_overlap``"""
+    return DateRange('start_date', 'end_date', RangeBoundary(inclusive_upper=True))
+
+
+class LeaveQuerySet(models.QuerySet):
+    def approved(self):
+        return self.filter(status='approved')
+
+    def covering(self, day):
+        """Leaves whose date range contains ``day``"""
+        return self.alias(period=leave_period()).filter(period__contains=day)
+
+    def overlapping(self, start_date, end_date):
+        """Leaves sharing at least one day with ``start_date``..``end_date``"""
+        return self.filter(start_date__lte=end_date, end_date__gte=start_date)
+
+
+class Leave(VersionedModel):
     LEAVE_STATUS_CHOICES = [
         ('pending', 'در انتظار تایید'),
         ('approved', 'تایید شده'),
@@ -105,7 +367,8 @@ class Leave(models.Model):
     ]
     
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leaves')
-    date = models.DateField()
+    start_date = models.DateField()
+    end_date = models.DateField()
     leave_type = models.CharField(max_length=20, choices=LEAVE_TYPE_CHOICES, default='annual')
     reason = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=LEAVE_STATUS_CHOICES, default='pending')
@@ -114,23 +377,334 @@ class Leave(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = LeaveQuerySet.as_manager()
+
     class Meta:
-        ordering = ['-date']
-        unique_together = ['employee', 'date']
+        ordering = ['-start_date']
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(end_date__gte=F('start_date')),
+                name='leave_end_date_after_start_date',
+            ),
+            # Also serves as the GiST index for "who is on leave on day X"
+            ExclusionConstraint(
+                name='leave_no_overlap',
+                expressions=[
+                    (leave_period(), RangeOperators.OVERLAPS),
+                    ('employee', RangeOperators.EQUAL),
+                ],
+                condition=~Q(status='rejected'),
+                violation_error_message='This employee already has a leave in this period.',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='leave_updated_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.employee.name} - {self.date} ({self.get_leave_type_display()})"
+        if self.start_date == self.end_date:
+            period = f"{self.start_date}"
+        else:
+            period = f"{self.start_date} - {self.end_date}"
+        return f"{self.employee.name} - {period} ({self.get_leave_type_display()})"
+
+    def duration_days(self):
+        """Number of calendar days covered by the leave"""
+        return (self.end_date - self.start_date).days + 1
+
+    def validate_constraints(self, exclude=None):
+        # leave_no_overlap's condition reads status, which forms don't edit
+        # directly; the instance always carries it, so never skip it.
+        if exclude:
+            exclude = set(exclude) - {'status'}
+        super().validate_constraints(exclude=exclude)
+
+    def save(self, *args, **kwargs):
+        """Approving a leave, or changing the days of an approved one, rechecks the balance.
+
+        Raises ValidationError if the employee doesn't have the days left.
+        """
+        if not self._takes_more_days():
+            return super().save(*args, **kwargs)
+
+        from .ledger import check_balance  # core.ledger imports this module
+
+        with transaction.atomic():
+            # One balance check per employee at a time, so two leaves that
+            # each fit can't both take the last days
+            Employee.objects.select_for_update(no_key=True).only('pk').get(pk=self.employee_id)
+            check_balance(self.employee_id, self.leave_type, self.start_date, self.end_date, leave=self)
+            super().save(*args, **kwargs)
+
+    def _takes_more_days(self):
+        if self.status != 'approved':
+            return False
+        changed = self.changed_fields()
+        return changed is None or not {'employee', 'start_date', 'end_date', 'leave_type', 'status'}.isdisjoint(changed)
 
     def approve(self, user):
-        """Approve the leave"""
+        """Approve the leave; raises EditConflict if it changed since it was read.
+
+        Raises ValidationError if the employee doesn't have the days left.
+        """
         self.status = 'approved'
         self.approved_by = user
         self.approved_at = timezone.now()
-        self.save()
+        self.save(update_fields=['status', 'approved_by', 'approved_at'])
 
     def reject(self, user):
-        """Reject the leave"""
+        """Reject the leave; raises EditConflict if it changed since it was read"""
         self.status = 'rejected'
         self.approved_by = user
         self.approved_at = timezone.now()
-        self.save()
+        self.save(update_fields=['status', 'approved_by', 'approved_at'])
+
+
+class Punch(models.Model):
+    """A clock-in or clock-out recorded by a badge terminal"""
+    PUNCH_TYPE_CHOICES = [
+        ('in', 'ورود'),
+        ('out', 'خروج'),
+    ]
+
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='punches')
+    punch_type = models.CharField(max_length=3, choices=PUNCH_TYPE_CHOICES)
+    punched_at = models.DateTimeField()
+    terminal = models.CharField(max_length=50)
+    # Generated by the terminal; a retried punch reuses it and is ignored
+    punch_id = models.CharField(max_length=64)
+    # Not enforced by the database: archive_shifts deletes old shifts, and
+    # their punches keep the id, which is also the ShiftArchive row's
+    shift = models.ForeignKey(
+        Shift,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='punches',
+    )
+    # Minutes late for a clock-in, or minutes early for a clock-out, relative
+    # to the matched shift (negative when early in / late out)
+    deviation_minutes = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-punched_at']
+        constraints = [
+            models.UniqueConstraint(fields=['terminal', 'punch_id'], name='punch_unique_per_terminal'),
+        ]
+        indexes = [
+            models.Index(fields=['employee', 'punched_at'], name='punch_employee_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} {self.punch_type} @ {self.punched_at:%Y-%m-%d %H:%M}"
+
+    def is_late(self):
+        return self.punch_type == 'in' and (self.deviation_minutes or 0) > 0
+
+    def is_early_leave(self):
+        return self.punch_type == 'out' and (self.deviation_minutes or 0) > 0
+
+
+class Job(models.Model):
+    """A unit of background work, claimed and run by ``manage.py run_jobs``"""
+    STATUS_CHOICES = [
+        ('queued', 'در صف'),
+        ('running', 'در حال اجرا'),
+        ('succeeded', 'انجام شد'),
+        ('failed', 'ناموفق'),
+    ]
+
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    # Not claimed before this time; pushed back after each failed attempt
+    run_after = models.DateTimeField(default=timezone.now)
+    progress = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Doubles as the worker heartbeat: jobqueue.run and progress updates touch it
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['run_after'], condition=Q(status='queued'), name='job_queued_idx'),
+            models.Index(fields=['updated_at'], condition=Q(status='running'), name='job_running_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+    def is_done(self):
+        return self.status in ('succeeded', 'failed')
+
+    def progress_percent(self):
+        if not self.progress_total:
+            return 100 if self.status == 'succeeded' else 0
+        return min(100, round(100 * self.progress / self.progress_total))
+
+
+class ComplianceViolation(models.Model):
+    """A labor-rule breach found by ``core.compliance.check``"""
+    RULE_CHOICES = [
+        ('weekly_hours', 'بیش از ساعات کاری هفتگی'),
+        ('min_rest', 'استراحت ناکافی بین شیفت‌ها'),
+        ('consecutive_days', 'روزهای کاری متوالی بیش از حد'),
+        ('leave_overlap', 'شیفت در روز مرخصی'),
+    ]
+
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='compliance_violations')
+    rule = models.CharField(max_length=20, choices=RULE_CHOICES)
+    # The offending shift, for rules about a single shift. Not enforced by the
+    # database, so the violation outlives the shift when archive_shifts
+    # moves it to ShiftArchive (which keeps its id)
+    shift = models.ForeignKey(
+        Shift,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='compliance_violations',
+    )
+    period_start = models.DateField()
+    period_end = models.DateField()
+    # Measured value and the limit it broke: hours, rest hours, days...
+    value = models.FloatField()
+    threshold = models.FloatField()
+    detected_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-period_start', 'employee_id']
+        indexes = [
+            models.Index(fields=['employee', 'period_end'], name='violation_employee_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee} - {self.get_rule_display()} ({self.period_start})"
+
+
+class LeaveLedgerEntry(models.Model):
+    """One append-only movement of an employee's leave days, written by core.ledger.
+
+    ``days`` is the effect on the balance: accruals add days, consumption
+    removes them and a reversal gives back days consumed earlier.
+    """
+    KIND_CHOICES = [
+        ('accrual', 'تخصیص'),
+        ('consumption', 'استفاده'),
+        ('reversal', 'برگشت'),
+        ('adjustment', 'اصلاح'),
+    ]
+
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leave_ledger')
+    leave_type = models.CharField(max_length=20, choices=Leave.LEAVE_TYPE_CHOICES)
+    year = models.PositiveSmallIntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    days = models.DecimalField(max_digits=7, decimal_places=2)
+    # Kept after the leave is deleted, so its consumption and reversal stay linked
+    leave = models.ForeignKey(
+        Leave,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='ledger_entries',
+    )
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        verbose_name_plural = 'leave ledger entries'
+        constraints = [
+            # Makes accrual runs idempotent
+            models.UniqueConstraint(
+                fields=['employee', 'leave_type', 'year'],
+                condition=Q(kind='accrual'),
+                name='ledger_one_accrual_per_year',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['employee', 'leave_type', 'year'], name='ledger_balance_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} {self.leave_type} {self.year}: {self.kind} {self.days}"
+
+
+class LeaveBalance(models.Model):
+    """Running totals of the ledger per employee, leave type and year"""
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leave_balances')
+    leave_type = models.CharField(max_length=20, choices=Leave.LEAVE_TYPE_CHOICES)
+    year = models.PositiveSmallIntegerField()
+    accrued = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    used = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['employee_id', '-year', 'leave_type']
+        constraints = [
+            # Also the index behind every balance lookup
+            models.UniqueConstraint(fields=['employee', 'leave_type', 'year'], name='leave_balance_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} {self.leave_type} {self.year}: {self.remaining}"
+
+    @property
+    def remaining(self):
+        return self.accrued - self.used
+
+
+class AuditEntry(models.Model):
+    """One change to an employee, shift or leave, recorded by core.audit.
+
+    The table is partitioned by month of ``created_at`` (see the 0013
+    migration and ``manage.py audit_partitions``), so its primary key in the
+    database is ``(id, created_at)``.
+    """
+    ACTION_CHOICES = [
+        ('create', 'ایجاد'),
+        ('update', 'ویرایش'),
+        ('delete', 'حذف'),
+        ('assign', 'تخصیص کارمند'),
+        ('unassign', 'لغو تخصیص'),
+    ]
+
+    created_at = models.DateTimeField(default=timezone.now)
+    # Kept when the user is deleted, like the history it explains
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    # Model name of the changed row: employee, shift or leave
+    object_type = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # {field: [old, new]}, or {'employees': [ids]} for (un)assignments
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        verbose_name_plural = 'audit entries'
+        indexes = [
+            models.Index(fields=['object_type', 'object_id', '-created_at', '-id'], name='audit_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.object_type} {self.object_id}: {self.action} @ {self.created_at:%Y-%m-%d %H:%M}"
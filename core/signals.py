@@ -0,0 +1,225 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import audit, ledger
+from .compliance import mark_employees_changed
+from .ical import forget_feeds, invalidate_feeds
+from .middleware import invalidate_cached_user
+from .models import Employee, Leave, Shift
+from .versions import bump_version
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Employee)
+def invalidate_employee_user(sender, instance, **kwargs):
+    invalidate_cached_user(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Employee)
+def bump_employee_version(sender, **kwargs):
+    bump_version('employee')
+
+
+@receiver([post_save, post_delete], sender=Shift)
+@receiver(m2m_changed, sender=Shift.employees.through)
+def bump_shift_version(sender, **kwargs):
+    bump_version('shift')
+
+
+@receiver([post_save, post_delete], sender=Leave)
+def bump_leave_version(sender, **kwargs):
+    bump_version('leave')
+
+
+def schedule_changed(employee_ids):
+    """Refresh what depends on these employees' shifts and leaves"""
+    employee_ids = set(employee_ids)
+    transaction.on_commit(lambda: invalidate_feeds(employee_ids))
+    mark_employees_changed(employee_ids)
+
+
+@receiver([post_save, post_delete], sender=Employee)
+def invalidate_employee_feed(sender, instance, **kwargs):
+    tokens = [instance.calendar_token]
+    transaction.on_commit(lambda: forget_feeds(tokens))
+
+
+@receiver(post_save, sender=Employee)
+def accrue_new_employee_leave(sender, instance, created, **kwargs):
+    if created:
+        ledger.accrue(timezone.localdate().year, [instance.pk])
+
+
+@receiver(post_save, sender=Employee)
+def recheck_employee_compliance(sender, instance, **kwargs):
+    # The weekly hours limit comes from the employee's working_hours
+    mark_employees_changed([instance.pk])
+
+
+@receiver(pre_delete, sender=Employee)
+def remember_employee_shifts(sender, instance, **kwargs):
+    # Deleting an employee cascades to their assignments without m2m_changed
+    instance._assigned_shift_ids = list(instance.shifts.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Employee)
+def recount_staffing_without_employee(sender, instance, **kwargs):
+    shift_ids = getattr(instance, '_assigned_shift_ids', [])
+    if shift_ids:
+        Shift.objects.filter(pk__in=shift_ids).refresh_assigned_counts()
+
+
+def is_archiving(origin):
+    """Whether a delete is ShiftArchive.archive_batch removing archived shifts"""
+    return isinstance(origin, QuerySet) and getattr(origin, 'archiving', False)
+
+
+@receiver(pre_delete, sender=Shift)
+def remember_shift_employees(sender, instance, origin, **kwargs):
+    # The assignments are gone by the time post_delete fires
+    if not is_archiving(origin):
+        instance._assigned_employee_ids = list(instance.employees.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Shift)
+def shift_schedule_changed(sender, instance, created, **kwargs):
+    if not created:
+        schedule_changed(instance.employees.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Shift)
+def deleted_shift_schedule_changed(sender, instance, origin, **kwargs):
+    if not is_archiving(origin):
+        schedule_changed(getattr(instance, '_assigned_employee_ids', []))
+
+
+@receiver(m2m_changed, sender=Shift.employees.through)
+def assignment_schedule_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # employee.shifts.add(...) and friends
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            schedule_changed([instance.pk])
+    elif action == 'pre_clear':
+        instance._assigned_employee_ids = list(instance.employees.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        schedule_changed(getattr(instance, '_assigned_employee_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        schedule_changed(pk_set)
+
+
+@receiver(pre_save, sender=Leave)
+def remember_leave_employee(sender, instance, **kwargs):
+    # An edit may move the leave to another employee or other days; both the
+    # old and the new schedule change
+    if not instance.pk:
+        return
+    fields = ('employee_id', 'start_date', 'end_date', 'status')
+    loaded = getattr(instance, '_loaded_values', {})
+    if all(name in loaded for name in fields):
+        # Read with the instance (see TrackedModel); no need to ask again
+        instance._previous = {name: loaded[name] for name in fields}
+    else:
+        instance._previous = Leave.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver([post_save, post_delete], sender=Leave)
+def leave_schedule_changed(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous', None) or {}
+    schedule_changed([instance.employee_id, previous.get('employee_id')])
+
+
+@receiver([post_save, post_delete], sender=Leave)
+def recount_staffing_around_leave(sender, instance, signal, **kwargs):
+    """Approved leave takes employees out of their shifts' assigned_count"""
+    previous = {}
+    if signal is post_save:
+        previous = getattr(instance, '_previous', None) or {}
+    if instance.status != 'approved' and previous.get('status') != 'approved':
+        return
+    employee_ids = {instance.employee_id, previous.get('employee_id', instance.employee_id)}
+    start = min(instance.start_date, previous.get('start_date', instance.start_date))
+    end = max(instance.end_date, previous.get('end_date', instance.end_date))
+    Shift.objects.filter(
+        employees__in=employee_ids,
+        start_time__date__lte=end,
+        end_time__date__gte=start,
+    ).refresh_assigned_counts()
+
+
+@receiver(post_save, sender=Leave)
+def post_leave_days(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous', None) or {}
+    if instance.status == 'approved' or previous.get('status') == 'approved':
+        ledger.post_leaves([instance.pk])
+
+
+@receiver(post_delete, sender=Leave)
+def reverse_deleted_leave_days(sender, instance, origin, **kwargs):
+    # Deleting the employee takes their ledger with them; only leaves
+    # deleted on their own give days back
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is Leave and instance.status == 'approved':
+        ledger.post_leaves([instance.pk])
+
+
+@receiver(post_save, sender=Shift)
+def recount_moved_shift(sender, instance, created, **kwargs):
+    # New times may overlap other leaves; new shifts are counted when their
+    # employees are assigned
+    if not created:
+        Shift.objects.filter(pk=instance.pk).refresh_assigned_counts()
+
+
+@receiver(m2m_changed, sender=Shift.employees.through)
+def touch_reassigned_shifts(sender, instance, action, reverse, pk_set, **kwargs):
+    """Recount staffing, and count the change as a shift update for ``updated_since`` syncs"""
+    if reverse and action == 'pre_clear':
+        instance._assigned_shift_ids = list(instance.shifts.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        shift_ids = [instance.pk]
+    elif action == 'post_clear':
+        shift_ids = getattr(instance, '_assigned_shift_ids', [])
+    else:
+        shift_ids = pk_set
+    Shift.objects.filter(pk__in=shift_ids).refresh_assigned_counts(touch_all=True)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_save, sender=Shift)
+@receiver(post_save, sender=Leave)
+def audit_save(sender, instance, created, update_fields, **kwargs):
+    audit.record_save(instance, created, update_fields)
+
+
+@receiver(post_delete, sender=Employee)
+@receiver(post_delete, sender=Shift)
+@receiver(post_delete, sender=Leave)
+def audit_delete(sender, instance, **kwargs):
+    audit.record_delete(instance)
+
+
+@receiver(m2m_changed, sender=Shift.employees.through)
+def audit_assignments(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_clear':
+        # Remembered on pre_clear by the receivers above
+        attribute = '_assigned_shift_ids' if reverse else '_assigned_employee_ids'
+        pk_set = getattr(instance, attribute, [])
+    elif action not in ('post_add', 'post_remove'):
+        return
+    audit.record_assignment(instance, 'assign' if action == 'post_add' else 'unassign', pk_set, reverse)
+
+
+@receiver(post_delete, sender=Employee)
+def audit_deleted_employee_assignments(sender, instance, **kwargs):
+    # The cascade removes the assignments without m2m_changed
+    audit.record_assignment(instance, 'unassign', getattr(instance, '_assigned_shift_ids', []), reverse=True)
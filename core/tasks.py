@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import audit
+from .compliance import check
+from .jobqueue import register, set_progress
+from .models import Shift, ShiftArchive
+
+
+@register('archive_shifts')
+def archive_shifts(job, days=None, batch_size=1000):
+    """Background version of ``manage.py archive_shifts``"""
+    if days is None:
+        days = settings.SHIFT_ARCHIVE_HORIZON_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+    finished = Shift.objects.filter(end_time__lt=cutoff)
+    total = finished.count()
+    set_progress(job, 0, total)
+
+    moved = 0
+    while True:
+        with audit.buffered():
+            batch = ShiftArchive.archive_batch(finished, batch_size)
+        if not batch:
+            break
+        moved += batch
+        set_progress(job, moved, message=f'Archived {moved} of {total} shifts')
+    return {'archived': moved, 'cutoff': cutoff.isoformat()}
+
+
+@register('check_compliance')
+def check_compliance(job, employee_ids=None):
+    set_progress(job, 0, 1, message='Checking labor rules')
+    found = check(employee_ids)
+    set_progress(job, 1)
+    return found
@@ -0,0 +1,16 @@
+from django import template
+
+from core.jalali import format_date
+
+register = template.Library()
+
+
+@register.filter(expects_localtime=True, is_safe=False)
+def jdate(value, arg='j F Y'):
+    """Format a date or datetime like ``|date``, in the Jalali calendar"""
+    if value in (None, ''):
+        return ''
+    try:
+        return format_date(value, arg)
+    except (AttributeError, ValueError):
+        return ''
@@ -1,3 +1,557 @@
-from django.test import TestCase
+import threading
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import audit, compliance, ical, jalali, jobqueue, ledger
+from .attendance import build_punches, record_punches
+from .models import (
+    AuditEntry, ComplianceViolation, EditConflict, Employee, Job, Leave, Punch, Shift, ShiftArchive,
+)
+from .versions import get_versions
+
+
+def run_concurrently(count, target):
+    """Run ``target(index)`` in ``count`` threads started together; return their results"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(index):
+        try:
+            barrier.wait()
+            results[index] = target(index)
+        except Exception as error:
+            results[index] = error
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+# Pages render without a collectstatic manifest
+without_manifest = override_settings(STORAGES={
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+
+# A fresh in-process cache, so users and fragments cached by an earlier run
+# (whose rows had the same ids) are never served
+local_cache = override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'},
+})
+
+
+@without_manifest
+@local_cache
+class VersionedSaveTests(TransactionTestCase):
+    """Each thread uses its own database connection, so the writers really race"""
+
+    def setUp(self):
+        now = timezone.now()
+        self.shift = Shift.objects.create(
+            name='Morning', start_time=now + timedelta(days=1), end_time=now + timedelta(days=1, hours=8)
+        )
+        user = User.objects.create_user('worker')
+        self.employee = Employee.objects.create(user=user, name='Worker', email='worker@example.com')
+        self.admin = User.objects.create_user('supervisor', is_staff=True)
+
+    def test_stale_save_raises_and_keeps_first_write(self):
+        first = Shift.objects.get(pk=self.shift.pk)
+        second = Shift.objects.get(pk=self.shift.pk)
+        first.name = 'Early'
+        first.save()
+        second.name = 'Late'
+        with self.assertRaises(EditConflict) as raised:
+            second.save()
+        self.assertEqual(raised.exception.current.name, 'Early')
+        self.assertEqual(second.version, 1)
+        self.shift.refresh_from_db()
+        self.assertEqual((self.shift.name, self.shift.version), ('Early', 2))
+
+    def test_save_writes_only_changed_fields(self):
+        shift = Shift.objects.get(pk=self.shift.pk)
+        shift.name = 'Early'
+        with CaptureQueriesContext(connection) as queries:
+            shift.save()
+        update = next(query['sql'] for query in queries if query['sql'].startswith('UPDATE'))
+        assignments = update.split(' SET ')[1].split(' WHERE ')[0]
+        self.assertIn('"name"', assignments)
+        self.assertNotIn('"start_time"', assignments)
+        self.assertNotIn('"required_headcount"', assignments)
+
+    def test_concurrent_increments_lose_no_update(self):
+        writers, increments = 6, 5
+
+        def increment(index):
+            conflicts = 0
+            for _ in range(increments):
+                while True:
+                    shift = Shift.objects.get(pk=self.shift.pk)
+                    shift.required_headcount += 1
+                    try:
+                        shift.save()
+                        break
+                    except EditConflict:
+                        conflicts += 1
+            return conflicts
+
+        results = run_concurrently(writers, increment)
+        for result in results:
+            self.assertIsInstance(result, int)
+        self.shift.refresh_from_db()
+        self.assertEqual(self.shift.required_headcount, 1 + writers * increments)
+        self.assertEqual(self.shift.version, 1 + writers * increments)
+
+    def test_concurrent_approve_and_reject_one_wins(self):
+        year = timezone.localdate().year
+        leave = Leave.objects.create(
+            employee=self.employee, start_date=date(year, 6, 1), end_date=date(year, 6, 2)
+        )
+
+        def decide(index):
+            loaded = Leave.objects.get(pk=leave.pk)
+            if index % 2:
+                loaded.reject(self.admin)
+            else:
+                loaded.approve(self.admin)
+            return loaded.status
+
+        results = run_concurrently(2, decide)
+        winners = [result for result in results if isinstance(result, str)]
+        self.assertEqual(len(winners), 1)
+        self.assertIsInstance(next(r for r in results if not isinstance(r, str)), EditConflict)
+        leave.refresh_from_db()
+        self.assertEqual(leave.status, winners[0])
+        self.assertEqual(leave.version, 2)
+        # The leave ledger follows the decision that was kept
+        balance = self.employee.leave_balances.get(leave_type='annual', year=year)
+        self.assertEqual(balance.used, 2 if leave.status == 'approved' else 0)
+
+    def test_stale_form_gets_conflict_with_diff(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin_dashboard:shift_update', args=[self.shift.pk])
+        data = {
+            'name': 'Evening',
+            'start_time': timezone.localtime(self.shift.start_time).strftime('%Y-%m-%dT%H:%M'),
+            'end_time': timezone.localtime(self.shift.end_time).strftime('%Y-%m-%dT%H:%M'),
+            'required_headcount': 1,
+            'version': self.shift.version,
+        }
+        other = Shift.objects.get(pk=self.shift.pk)
+        other.name = 'Night'
+        other.save()
+
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.context['conflict'], [{'label': 'Name', 'mine': 'Evening', 'theirs': 'Night'}])
+        self.shift.refresh_from_db()
+        self.assertEqual(self.shift.name, 'Night')
+
+        # Saving again from the conflict page overwrites on purpose
+        data['version'] = self.shift.version
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        self.shift.refresh_from_db()
+        self.assertEqual(self.shift.name, 'Evening')
+
+
+    def test_approving_an_edited_leave_from_a_stale_list_conflicts(self):
+        self.client.force_login(self.admin)
+        year = timezone.localdate().year + 1
+        leave = Leave.objects.create(
+            employee=self.employee, leave_type='sick', start_date=date(year, 6, 1), end_date=date(year, 6, 2)
+        )
+        rendered = leave.version
+        other = Leave.objects.get(pk=leave.pk)
+        other.end_date = date(year, 6, 9)
+        other.save()
+
+        url = reverse('admin_dashboard:leave_approve', args=[leave.pk])
+        self.assertEqual(self.client.get(url).status_code, 405)
+        response = self.client.post(url, {'version': rendered})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.context['leave'].end_date, date(year, 6, 9))
+        leave.refresh_from_db()
+        self.assertEqual(leave.status, 'pending')
+
+        # Approving from the conflict page, which shows the current version
+        response = self.client.post(url, {'version': leave.version})
+        self.assertEqual(response.status_code, 302)
+        leave.refresh_from_db()
+        self.assertEqual(leave.status, 'approved')
+
+@without_manifest
+@local_cache
+class AuditTrailTests(TransactionTestCase):
+    """Entries are only written once their transaction commits, hence TransactionTestCase"""
+
+    def setUp(self):
+        # Whole minutes, as the shift form submits them
+        now = timezone.now().replace(second=0, microsecond=0)
+        self.shift = Shift.objects.create(
+            name='Morning', start_time=now + timedelta(days=1), end_time=now + timedelta(days=1, hours=8)
+        )
+        user = User.objects.create_user('worker')
+        self.employee = Employee.objects.create(user=user, name='Worker', email='worker@example.com')
+        self.admin = User.objects.create_user('supervisor', is_staff=True)
+        self.client.force_login(self.admin)
+
+    def entries(self, **filters):
+        return list(AuditEntry.objects.filter(**filters).order_by('id').values_list('action', 'actor_id', 'changes'))
+
+    def test_request_writes_its_entries_with_one_insert(self):
+        AuditEntry.objects.all().delete()
+        data = {
+            'name': 'Evening',
+            'start_time': timezone.localtime(self.shift.start_time).strftime('%Y-%m-%dT%H:%M'),
+            'end_time': timezone.localtime(self.shift.end_time).strftime('%Y-%m-%dT%H:%M'),
+            'required_headcount': 1,
+            'employees': [self.employee.pk],
+            'version': self.shift.version,
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('admin_dashboard:shift_update', args=[self.shift.pk]), data)
+        self.assertEqual(response.status_code, 302)
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "core_auditentry"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.entries(object_type='shift', object_id=self.shift.pk), [
+            ('update', self.admin.pk, {'name': ['Morning', 'Evening']}),
+            ('assign', self.admin.pk, {'employees': [self.employee.pk]}),
+        ])
+
+    def test_rolled_back_change_is_not_recorded(self):
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                self.shift.name = 'Night'
+                self.shift.save()
+                raise ValueError
+        self.assertEqual(self.entries(object_type='shift', object_id=self.shift.pk, action='update'), [])
+
+    def test_history_shows_who_approved_the_leave(self):
+        leave = Leave.objects.create(
+            employee=self.employee, start_date=date(2030, 6, 1), end_date=date(2030, 6, 2)
+        )
+        self.client.post(reverse('admin_dashboard:leave_approve', args=[leave.pk]), {'version': leave.version})
+        self.assertEqual(self.entries(object_type='leave', object_id=leave.pk, action='update')[0][:2], (
+            'update', self.admin.pk,
+        ))
+
+        response = self.client.get(reverse('admin_dashboard:object_history', args=['leave', leave.pk]))
+        changes = {change['label']: change for change in response.context['rows'][0]['changes']}
+        self.assertEqual(changes['Status']['old'], 'در انتظار تایید')
+        self.assertEqual(changes['Status']['new'], 'تایید شده')
+        self.assertEqual(changes['Approved by']['new'], 'supervisor')
+
+    def test_buffered_block_writes_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            with audit.buffered():
+                self.shift.employees.add(self.employee)
+                self.employee.shifts.clear()
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "core_auditentry"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            [action for action, _, _ in self.entries(object_type='shift', object_id=self.shift.pk)][-2:],
+            ['assign', 'unassign'],
+        )
+
+    def test_new_partition_takes_rows_from_the_default_partition(self):
+        far = timezone.now() + timedelta(days=3660)
+        entry = AuditEntry.objects.create(created_at=far, object_type='shift', object_id=1, action='update')
+        name = f'core_auditentry_p{far:%Y%m}'
+        self.assertEqual(audit.create_partitions(ahead=0, today=far.date()), [name])
+
+        def drop_partition():
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE {name}')
+
+        self.addCleanup(drop_partition)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM core_auditentry WHERE id = %s', [entry.pk])
+            self.assertEqual(cursor.fetchone()[0], name)
+
+
+class ArchivedPunchTests(TestCase):
+    def test_archiving_keeps_the_shift_of_matched_punches(self):
+        start = (timezone.now() - timedelta(days=10)).replace(second=0, microsecond=0)
+        shift = Shift.objects.create(name='Old', start_time=start, end_time=start + timedelta(hours=8))
+        user = User.objects.create_user('worker')
+        employee = Employee.objects.create(user=user, name='Worker', email='worker@example.com')
+        shift.employees.add(employee)
+        punches, errors = build_punches([{
+            'employee': employee.pk,
+            'punch_type': 'in',
+            'punched_at': (start + timedelta(minutes=5)).isoformat(),
+            'terminal': 'gate',
+            'punch_id': '1',
+        }])
+        self.assertEqual(errors, [])
+        record_punches(punches)
+
+        call_command('archive_shifts', days=1, stdout=StringIO())
+
+        self.assertFalse(Shift.objects.filter(pk=shift.pk).exists())
+        punch = Punch.objects.get()
+        self.assertEqual(punch.shift_id, shift.pk)
+        self.assertEqual(punch.deviation_minutes, 5)
+        self.assertEqual(ShiftArchive.objects.get(pk=punch.shift_id).name, 'Old')
+
+
+@override_settings(LEAVE_ENTITLEMENTS={'annual': 26})
+@without_manifest
+class LeaveBalanceTests(TestCase):
+    def setUp(self):
+        self.year = timezone.localdate().year + 1
+        user = User.objects.create_user('worker')
+        self.employee = Employee.objects.create(user=user, name='Worker', email='worker@example.com')
+        self.admin = User.objects.create_user('supervisor', is_staff=True)
+
+    def leave(self, start_day, end_day):
+        return Leave.objects.create(
+            employee=self.employee, leave_type='annual',
+            start_date=date(self.year, 3, start_day), end_date=date(self.year, 3, end_day),
+        )
+
+    def test_year_without_accrual_counts_the_entitlement(self):
+        self.assertEqual(ledger.remaining_days(self.employee.pk, 'annual', self.year), 26)
+        self.leave(1, 5).approve(self.admin)
+        self.assertEqual(ledger.remaining_days(self.employee.pk, 'annual', self.year), 21)
+        ledger.accrue(self.year)
+        self.assertEqual(ledger.remaining_days(self.employee.pk, 'annual', self.year), 21)
+
+    def test_approval_rechecks_the_balance(self):
+        first, second = self.leave(1, 20), self.leave(21, 30)
+        first.approve(self.admin)
+        with self.assertRaises(ValidationError):
+            second.approve(self.admin)
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'pending')
+        self.assertEqual(ledger.remaining_days(self.employee.pk, 'annual', self.year), 6)
+
+    def test_editing_an_approved_leave_rechecks_the_balance_under_the_lock(self):
+        first, second = self.leave(1, 20), self.leave(25, 26)
+        first.approve(self.admin)
+        second.approve(self.admin)
+        data = {
+            'employee': self.employee.pk, 'leave_type': 'annual', 'reason': '', 'version': second.version,
+            'start_date': date(self.year, 3, 25).isoformat(), 'end_date': date(self.year, 3, 31).isoformat(),
+        }
+        self.client.force_login(self.admin)
+        # As if the other leave was approved after the form was validated
+        with mock.patch('admin_dashboard.forms.LeaveForm.check_balance'), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('admin_dashboard:leave_update', args=[second.pk]), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].non_field_errors())
+        self.assertTrue(any(query['sql'].endswith('FOR NO KEY UPDATE') for query in queries))
+        second.refresh_from_db()
+        self.assertEqual(second.end_date, date(self.year, 3, 26))
+
+
+class AssignedCountTests(TestCase):
+    def test_leave_approval_touches_only_recounted_shifts(self):
+        start = (timezone.now() + timedelta(days=30)).replace(second=0, microsecond=0)
+        user = User.objects.create_user('worker')
+        employee = Employee.objects.create(user=user, name='Worker', email='worker@example.com')
+        covered, later = (
+            Shift.objects.create(name=name, start_time=start + offset, end_time=start + offset + timedelta(hours=8))
+            for name, offset in (('Covered', timedelta()), ('Later', timedelta(days=5)))
+        )
+        employee.shifts.add(covered, later)
+        stamps = dict(Shift.objects.values_list('name', 'updated_at'))
+
+        day = timezone.localdate(start)
+        Leave.objects.create(
+            employee=employee, leave_type='sick', start_date=day, end_date=day,
+        ).approve(User.objects.create_user('supervisor', is_staff=True))
+
+        covered.refresh_from_db()
+        later.refresh_from_db()
+        self.assertEqual((covered.assigned_count, later.assigned_count), (0, 1))
+        self.assertGreater(covered.updated_at, stamps['Covered'])
+        self.assertEqual(later.updated_at, stamps['Later'])
+
+
+@override_settings(COMPLIANCE_WEEK_START=5, COMPLIANCE_MAX_CONSECUTIVE_DAYS=6)
+class ComplianceTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('worker')
+        self.employee = Employee.objects.create(
+            user=user, name='Worker', email='worker@example.com', working_hours=40
+        )
+        today = timezone.localdate()
+        # A Saturday, the first day of the week
+        self.week = today + timedelta(days=7 + (5 - today.weekday()) % 7)
+
+    def shift(self, day):
+        start = timezone.make_aware(datetime.combine(day, time(9)))
+        return Shift.objects.create(name=f'{day}', start_time=start, end_time=start + timedelta(hours=8))
+
+    def test_edits_queue_a_recheck(self):
+        shift = self.shift(self.week)
+        with self.captureOnCommitCallbacks(execute=True):
+            shift.employees.add(self.employee)
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'check_compliance')
+        self.assertIn(self.employee.pk, job.kwargs['employee_ids'])
+        self.assertFalse(ComplianceViolation.objects.exists())
+
+    def test_recheck_reads_the_week_and_run_crossing_since(self):
+        for offset in range(7):
+            self.shift(self.week + timedelta(days=offset)).employees.add(self.employee)
+
+        compliance.check([self.employee.pk], since=self.week + timedelta(days=6))
+
+        found = dict(ComplianceViolation.objects.values_list('rule', 'value'))
+        self.assertEqual(found, {'weekly_hours': 56, 'consecutive_days': 7})
+
+    def test_archiving_keeps_violations_and_queues_no_recheck(self):
+        old = self.week - timedelta(days=210)
+        shift = self.shift(old)
+        shift.employees.add(self.employee)
+        ComplianceViolation.objects.create(
+            employee=self.employee, rule='min_rest', shift=shift,
+            period_start=old, period_end=old, value=8, threshold=11,
+        )
+        Job.objects.all().delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_shifts', days=1, stdout=StringIO())
+
+        self.assertEqual(ComplianceViolation.objects.get().shift_id, shift.pk)
+        self.assertFalse(Job.objects.exists())
+
+
+@local_cache
+class ScheduleChangeTests(TestCase):
+    def setUp(self):
+        self.employees = []
+        for index in range(3):
+            user = User.objects.create_user(f'worker{index}')
+            self.employees.append(
+                Employee.objects.create(user=user, name=f'Worker {index}', email=f'worker{index}@example.com')
+            )
+
+    def old_shifts(self, count):
+        start = timezone.now() - timedelta(days=200)
+        for index in range(count):
+            shift = Shift.objects.create(
+                name='Old', start_time=start + timedelta(hours=index), end_time=start + timedelta(hours=index + 1)
+            )
+            shift.employees.add(*self.employees)
+
+    def test_feed_rendered_across_a_change_is_not_cached(self):
+        token = self.employees[0].calendar_token
+        render = ical.render_feed
+
+        def render_then_change(employee):
+            body = render(employee)
+            # A schedule change commits while the old schedule is rendered
+            with self.captureOnCommitCallbacks(execute=True):
+                ical.invalidate_feeds([employee.pk])
+            return body
+
+        with mock.patch.object(ical, 'render_feed', render_then_change):
+            ical.get_feed(token)
+        self.assertIsNone(cache.get(ical.feed_cache_key(token)))
+
+        ical.get_feed(token)
+        with self.assertNumQueries(0):
+            ical.get_feed(token)
+
+    def test_versions_change_when_the_edit_commits(self):
+        before = get_versions('shift')
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.old_shifts(1)
+                self.assertEqual(get_versions('shift'), before)
+        self.assertNotEqual(get_versions('shift'), before)
+
+    def test_archive_batch_queries_do_not_grow_with_the_batch(self):
+        queries = []
+        for count in (2, 10):
+            self.old_shifts(count)
+            with self.captureOnCommitCallbacks(execute=True):
+                with CaptureQueriesContext(connection) as captured:
+                    self.assertEqual(ShiftArchive.archive_batch(Shift.objects.all(), 100), count)
+            queries.append(len(captured))
+        self.assertEqual(queries[0], queries[1])
+        self.assertFalse(Job.objects.filter(name='check_compliance').exists())
+
+    def test_leave_update_reuses_the_loaded_values(self):
+        year = timezone.localdate().year + 1
+        leave = Leave.objects.create(
+            employee=self.employees[0], leave_type='sick', start_date=date(year, 2, 1), end_date=date(year, 2, 1)
+        )
+        counts = []
+        for forget in (False, True):
+            leave = Leave.objects.get(pk=leave.pk)
+            if forget:
+                del leave._loaded_values
+            leave.reason = f'Forgot: {forget}'
+            with CaptureQueriesContext(connection) as captured:
+                leave.save()
+            counts.append(len(captured))
+        self.assertEqual(counts[0] + 1, counts[1])
+
+
+class JobHeartbeatTests(TransactionTestCase):
+    """The heartbeat thread has its own connection, so the job row must be committed"""
+
+    def test_running_job_is_not_requeued(self):
+        def sleepy(job):
+            threading.Event().wait(0.5)
+            return {'requeued': jobqueue.requeue_stale()}
+
+        jobqueue.register('sleepy')(sleepy)
+        self.addCleanup(jobqueue.registry.pop, 'sleepy')
+        job = Job.objects.create(name='sleepy', status='running', attempts=1)
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+
+        with self.settings(JOB_HEARTBEAT_SECONDS=0.05, JOB_STALE_AFTER_SECONDS=0.3):
+            self.assertTrue(jobqueue.run(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ('succeeded', {'requeued': 0}))
+
+
+class JalaliTests(SimpleTestCase):
+    KNOWN = {
+        date(1921, 3, 21): (1300, 1, 1),
+        date(1979, 2, 11): (1357, 11, 22),
+        date(2000, 1, 1): (1378, 10, 11),
+        date(2024, 3, 20): (1403, 1, 1),
+        date(2025, 3, 20): (1403, 12, 30),
+        date(2026, 10, 19): (1405, 7, 27),
+    }
+
+    def test_known_dates(self):
+        for gregorian, expected in self.KNOWN.items():
+            with self.subTest(gregorian=gregorian):
+                self.assertEqual(jalali.to_jalali(gregorian), expected)
+                self.assertEqual(jalali.to_gregorian(*expected), gregorian)
+
+    def test_iter_days_matches_conversion_across_years(self):
+        start = date(2024, 1, 1)
+        for day, jalali_day in jalali.iter_days(start, start + timedelta(days=1500)):
+            self.assertEqual(jalali_day, jalali.to_jalali(day))
+
+    def test_leap_years(self):
+        self.assertEqual([year for year in range(1395, 1411) if jalali.is_leap(year)], [1395, 1399, 1403, 1408])
+
+    def test_format(self):
+        self.assertEqual(jalali.format_date(date(2026, 10, 19), r'l، j F Y \- m/d'), 'دوشنبه، 27 مهر 1405 - 07/27')
@@ -9,4 +9,7 @@ urlpatterns = [
     path('dashboard/', views.employee_dashboard, name='employee_dashboard'),
     path('profile/create/', views.create_employee_profile, name='create_employee_profile'),
     path('profile/update/', views.update_employee_profile, name='update_employee_profile'),
+    path('attendance/punch/', views.punch, name='punch'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
+    path('calendar/reset/', views.reset_calendar_token, name='reset_calendar_token'),
 ]
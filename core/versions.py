@@ -0,0 +1,50 @@
+"""Data version tokens used to key cached template fragments.
+
+Each tracked model has a token in the cache that changes whenever a
+transaction that saved or deleted one of its rows commits (see core.signals). Fragments include the tokens
+they depend on in their cache key, so an edit makes them miss and re-render
+while untouched fragments keep being served from the cache.
+"""
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def version_key(name):
+    return f'data-version:{name}'
+
+
+def get_versions(*names):
+    """Return the current token for each data set, e.g. {'shift': '3f2a...'}"""
+    keys = {version_key(name): name for name in names}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        # A fresh random token never collides with fragments cached under a
+        # token that was evicted, so losing the key can't serve stale HTML.
+        cache.add(key, uuid.uuid4().hex, None)
+        found[key] = cache.get(key)
+    return {keys[key]: token for key, token in found.items()}
+
+
+_bumped = threading.local()
+
+
+def bump_version(name):
+    """Invalidate every fragment that depends on ``name`` once the current transaction commits.
+
+    A new token set before the commit could be picked up by a request that
+    still reads the old rows, caching them under it until the next edit.
+    """
+    _bumped.__dict__.setdefault('names', set()).add(name)
+    # One callback per bump, but the first one to run takes the whole set.
+    # Names left over from a rolled-back transaction are bumped with the
+    # next commit, which only costs a re-render.
+    transaction.on_commit(apply_bumps)
+
+
+def apply_bumps():
+    names = _bumped.__dict__.pop('names', None)
+    if names:
+        cache.set_many({version_key(name): uuid.uuid4().hex for name in names}, None)
@@ -1,9 +1,23 @@
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render, redirect
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate
 from django.contrib import messages
 from django.utils import timezone
-from .models import Employee
+from .attendance import build_punches, record_punches
+from .ical import forget_feeds, get_feed
+from .models import Employee, Shift, new_calendar_token
+from .versions import get_versions
 from django.contrib.auth import logout
 from admin_dashboard.forms import UserRegistrationForm
 from admin_dashboard.forms import EmployeeForm
@@ -26,13 +40,33 @@ def employee_dashboard(request):
     is_on_leave = employee.is_on_leave_today()
     today_leave = employee.get_today_leave() if is_on_leave else None
     
+    # Evaluated only when the cached fragment is rendered again
+    open_shifts = (
+        Shift.objects.upcoming().understaffed()
+        .exclude(employees=employee)
+        .order_by('start_time')[:settings.DASHBOARD_OPEN_SHIFTS]
+    )
+
+    year = timezone.localdate().year
+    leave_balances = employee.leave_balances.filter(
+        year=year, leave_type__in=settings.LEAVE_ENTITLEMENTS
+    ).order_by('leave_type')
+
     context = {
         'employee': employee,
         'current_shift': current_shift,
+        'open_shifts': open_shifts,
+        'leave_balances': leave_balances,
+        'year': year,
         'next_shift': next_shift,
         'is_on_leave': is_on_leave,
         'today_leave': today_leave,
+        'calendar_url': request.build_absolute_uri(
+            reverse('core:calendar_feed', args=[employee.calendar_token])
+        ),
         'now': timezone.now(),
+        'versions': get_versions('employee', 'shift', 'leave'),
+        'fragment_timeout': settings.DASHBOARD_FRAGMENT_TIMEOUT,
     }
     return render(request, 'core/employee_dashboard.html', context)
 
@@ -120,3 +154,67 @@ def home(request):
             return redirect('core:employee_dashboard')
     
     return render(request, 'core/home.html')
+
+
+def is_valid_terminal(request):
+    """Check the shared secret a badge terminal sends with its punches"""
+    token = request.headers.get('X-Terminal-Token', '')
+    return any(
+        constant_time_compare(token, expected)
+        for expected in settings.ATTENDANCE_TERMINAL_TOKENS
+    )
+
+
+@csrf_exempt
+@require_POST
+def punch(request):
+    """Accept a single punch or a batch of punches from a badge terminal"""
+    if not is_valid_terminal(request):
+        return JsonResponse({'error': 'Invalid terminal token.'}, status=403)
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Body must be JSON.'}, status=400)
+
+    items = payload if isinstance(payload, list) else [payload]
+    if len(items) > settings.ATTENDANCE_MAX_BATCH_SIZE:
+        return JsonResponse(
+            {'error': f'At most {settings.ATTENDANCE_MAX_BATCH_SIZE} punches per request.'},
+            status=413,
+        )
+
+    punches, errors = build_punches(items)
+    record_punches(punches)
+    return JsonResponse({'accepted': len(punches), 'errors': errors})
+
+
+@require_GET
+def calendar_feed(request, token):
+    """Subscribable .ics feed of an employee's shifts and approved leaves"""
+    feed = get_feed(token)
+    if feed is None:
+        raise Http404('Unknown calendar')
+    etag, body = feed
+    response = get_conditional_response(request, etag=quote_etag(etag))
+    if response is None:
+        response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'inline; filename="shiftflow.ics"'
+    response['ETag'] = quote_etag(etag)
+    patch_cache_control(response, private=True, max_age=settings.ICAL_REFRESH_MINUTES * 60)
+    return response
+
+
+@login_required
+@require_POST
+def reset_calendar_token(request):
+    """Issue a new feed URL; subscriptions to the old one stop working"""
+    try:
+        employee = request.user.employee_profile
+    except Employee.DoesNotExist:
+        return redirect('core:create_employee_profile')
+    old_tokens = [employee.calendar_token]
+    employee.calendar_token = new_calendar_token()
+    employee.save(update_fields=['calendar_token', 'updated_at'])
+    transaction.on_commit(lambda: forget_feeds(old_tokens))
+    messages.success(request, 'Your calendar link has been reset.')
+    return redirect('core:employee_dashboard')
@@ -0,0 +1,61 @@
+"""Production gunicorn settings, read automatically from the project root.
+
+    gunicorn                       # uses this file
+    GUNICORN_WORKERS=8 gunicorn
+
+The project is imported and warmed up once in the master (``preload_app``),
+then frozen with ``gc.freeze()`` right before workers fork, so workers start
+in milliseconds and share those memory pages with the master instead of
+each holding a private copy. ``python manage.py bench_startup`` measures it.
+"""
+import gc
+import multiprocessing
+import os
+
+wsgi_app = "shift_management.wsgi:application"
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+# Recycle workers now and then; jitter keeps them from restarting together
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 200))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+accesslog = os.environ.get("GUNICORN_ACCESSLOG", "-")
+
+if preload_app:
+    # A collection during the import would touch, and so un-share, most of
+    # the objects created so far; collect only once, before freezing
+    gc.disable()
+
+
+def on_starting(server):
+    """Refuse a per-process cache when several workers would each hold a copy"""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "shift_management.settings")
+    from django.conf import settings
+
+    backend = settings.CACHES["default"]["BACKEND"]
+    if server.cfg.workers > 1 and backend.endswith(".locmem.LocMemCache"):
+        raise RuntimeError(
+            f"CACHE_BACKEND {backend} is local to each process, so sessions, cached users and "
+            f"calendar feeds invalidated in one of the {server.cfg.workers} workers would stay "
+            "valid in the others. Use a shared cache backend or GUNICORN_WORKERS=1."
+        )
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded and before the first fork"""
+    if not preload_app:
+        return
+    from shift_management.warmup import warm_up
+
+    stats = warm_up()
+    server.log.info(
+        "Warmed up %(templates)d templates and %(url_patterns)d URL patterns in %(seconds).2fs",
+        stats,
+    )
+    gc.collect()
+    # Move everything alive now out of the collector's reach, so collections
+    # in the workers don't write to (and copy) the shared pages
+    gc.freeze()
+    gc.enable()
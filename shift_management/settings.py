@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     
     # Third party apps
     "crispy_forms",
@@ -50,6 +51,7 @@ INSTALLED_APPS = [
     # Local apps
     "core",
     "admin_dashboard",
+    "api",
 ]
 
 # Crispy Forms Configuration
@@ -62,7 +64,8 @@ MIDDLEWARE = [
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.CachedAuthenticationMiddleware",
+    "core.middleware.AuditMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -107,6 +110,39 @@ DATABASES = {
     }
 }
 
+# Cache
+# Shared by every gunicorn worker, so that a logout, a permission change or a
+# reset calendar token invalidates the cached copy for all of them. Files
+# under BASE_DIR by default; point CACHE_BACKEND/CACHE_LOCATION at Redis or
+# the database for several hosts. A per-process LocMemCache is refused by
+# gunicorn.conf.py when more than one worker runs.
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.environ.get("CACHE_LOCATION", str(BASE_DIR / ".cache" / "django")),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", 10000)),
+        },
+    }
+}
+
+# Sessions are read from the cache and written through to the database
+SESSION_ENGINE = os.environ.get("SESSION_ENGINE", "django.contrib.sessions.backends.cached_db")
+
+# Seconds a logged-in user (with its employee profile) stays cached
+USER_CACHE_TIMEOUT = int(os.environ.get("USER_CACHE_TIMEOUT", 300))
+
+# Upper bound for cached dashboard fragments. Edits invalidate them right
+# away through data versions (core.versions); this only limits how stale
+# time-dependent bits such as "active shifts" or "5 minutes ago" can get.
+DASHBOARD_FRAGMENT_TIMEOUT = int(os.environ.get("DASHBOARD_FRAGMENT_TIMEOUT", 60))
+
+# Open shifts listed on the employee dashboard
+DASHBOARD_OPEN_SHIFTS = int(os.environ.get("DASHBOARD_OPEN_SHIFTS", 5))
+
+# Shifts listed in a day of the month schedule; the others are counted
+SCHEDULE_SHIFTS_PER_DAY = int(os.environ.get("SCHEDULE_SHIFTS_PER_DAY", 4))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -146,6 +182,22 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Hashed file names plus gzip/brotli copies; WhiteNoise serves the hashed
+# files with far-future immutable cache headers.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+
+# Tailwind build (`python manage.py build_css`)
+TAILWIND_CLI = os.environ.get("TAILWIND_CLI", "tailwindcss")
+TAILWIND_INPUT_CSS = BASE_DIR / "assets" / "app.css"
+TAILWIND_OUTPUT_CSS = BASE_DIR / "static" / "css" / "app.css"
+
 # Media files
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media"
@@ -158,4 +210,69 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Authentication settings
 LOGIN_REDIRECT_URL = "core:home"
 LOGIN_URL = "/login/"
-LOGOUT_REDIRECT_URL = "core:home"
\ No newline at end of file
+LOGOUT_REDIRECT_URL = "core:home"
+
+# Shift archival
+# Finished shifts older than this are moved to core.ShiftArchive by `manage.py archive_shifts`
+SHIFT_ARCHIVE_HORIZON_DAYS = int(os.environ.get("SHIFT_ARCHIVE_HORIZON_DAYS", 90))
+
+# Attendance terminals
+# Comma-separated shared secrets sent by badge terminals as X-Terminal-Token
+ATTENDANCE_TERMINAL_TOKENS = [
+    token for token in os.environ.get("ATTENDANCE_TERMINAL_TOKENS", "").split(",") if token
+]
+ATTENDANCE_MAX_BATCH_SIZE = int(os.environ.get("ATTENDANCE_MAX_BATCH_SIZE", 1000))
+# How far from a shift's start/end a punch may be and still count for that shift
+ATTENDANCE_MATCH_WINDOW_MINUTES = int(os.environ.get("ATTENDANCE_MATCH_WINDOW_MINUTES", 180))
+
+# Background jobs (core.jobqueue, run by `manage.py run_jobs`)
+JOB_POLL_INTERVAL_SECONDS = float(os.environ.get("JOB_POLL_INTERVAL_SECONDS", 2))
+# First retry delay; doubled after every further failed attempt
+JOB_RETRY_DELAY_SECONDS = int(os.environ.get("JOB_RETRY_DELAY_SECONDS", 30))
+# A running job whose worker has not sent a heartbeat for this long is requeued
+JOB_STALE_AFTER_SECONDS = int(os.environ.get("JOB_STALE_AFTER_SECONDS", 900))
+# How often a worker touches the job it is running; well below the above
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", 60))
+
+# Calendar feeds (core.ical)
+# Feeds list shifts and leaves from this many days ago onward
+ICAL_PAST_DAYS = int(os.environ.get("ICAL_PAST_DAYS", 30))
+# How often calendar clients are asked to poll the feed
+ICAL_REFRESH_MINUTES = int(os.environ.get("ICAL_REFRESH_MINUTES", 15))
+# Upper bound on a cached feed's age, so its date window keeps moving
+ICAL_CACHE_TIMEOUT = int(os.environ.get("ICAL_CACHE_TIMEOUT", 60 * 60 * 24))
+
+# JSON API (api app, mounted at /api/v1/)
+# Comma-separated tokens clients send as "Authorization: Bearer <token>"
+API_TOKENS = [token for token in os.environ.get("API_TOKENS", "").split(",") if token]
+API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", 500))
+API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", 5000))
+API_MAX_BULK_SIZE = int(os.environ.get("API_MAX_BULK_SIZE", 1000))
+# Rows changed this recently are left out of collection pages. updated_at is
+# stamped before the transaction commits, so a row may become visible after
+# a later-stamped one a client already synced past; this must exceed the
+# longest write transaction.
+API_SYNC_LAG_SECONDS = int(os.environ.get("API_SYNC_LAG_SECONDS", 60))
+
+# Labor-rule compliance (core.compliance)
+# Audits cover shifts ending within this many days back, plus the whole future schedule
+COMPLIANCE_LOOKBACK_DAYS = int(os.environ.get("COMPLIANCE_LOOKBACK_DAYS", 28))
+COMPLIANCE_MIN_REST_HOURS = float(os.environ.get("COMPLIANCE_MIN_REST_HOURS", 11))
+COMPLIANCE_MAX_CONSECUTIVE_DAYS = int(os.environ.get("COMPLIANCE_MAX_CONSECUTIVE_DAYS", 6))
+# First day of the week for weekly hour totals (Monday=0 ... Saturday=5)
+COMPLIANCE_WEEK_START = int(os.environ.get("COMPLIANCE_WEEK_START", 5))
+
+# Leave balances (core.ledger)
+# Days accrued per employee and calendar year for each limited leave type;
+# types not listed here (e.g. "other") are not balance-checked
+LEAVE_ENTITLEMENTS = {
+    "annual": int(os.environ.get("LEAVE_ANNUAL_DAYS", 26)),
+    "sick": int(os.environ.get("LEAVE_SICK_DAYS", 12)),
+    "personal": int(os.environ.get("LEAVE_PERSONAL_DAYS", 3)),
+}
+
+# Audit trail (core.audit)
+# Monthly partitions are created this many months ahead by `manage.py audit_partitions`
+AUDIT_PARTITIONS_AHEAD = int(os.environ.get("AUDIT_PARTITIONS_AHEAD", 3))
+# The same command drops partitions older than this many months; 0 keeps everything
+AUDIT_RETENTION_MONTHS = int(os.environ.get("AUDIT_RETENTION_MONTHS", 0))
@@ -0,0 +1,78 @@
+"""Load what requests would otherwise load lazily, before gunicorn forks.
+
+With ``preload_app`` the master process imports the project once; calling
+:func:`warm_up` there as well compiles every template into the cached
+loader, fills the URL resolvers and loads translation catalogs, so workers
+start with all of it in memory pages shared with the master.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+from django.utils import translation
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(engine):
+    """Names of every template the engine can find, project and app directories alike"""
+    dirs = [Path(path) for path in engine.dirs]
+    if engine.app_dirs:
+        dirs += [Path(path) for path in get_app_template_dirs('templates')]
+    names = set()
+    for directory in dirs:
+        names.update(
+            path.relative_to(directory).as_posix()
+            for path in directory.rglob('*')
+            if path.is_file() and path.suffix in ('.html', '.txt', '.xml', '.ics')
+        )
+    return sorted(names)
+
+
+def warm_templates():
+    loaded = 0
+    for engine in engines.all():
+        engine = getattr(engine, 'engine', None)
+        if engine is None:
+            continue
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError:
+                # e.g. admin templates for apps that aren't installed
+                logger.debug('Skipped template %s', name, exc_info=True)
+            else:
+                loaded += 1
+    return loaded
+
+
+def warm_resolvers(resolver=None):
+    """Build the reverse lookup tables of the root resolver and every namespace"""
+    resolver = resolver or get_resolver()
+    count = len(resolver.reverse_dict)
+    for _, namespace_resolver in resolver.namespace_dict.values():
+        count += warm_resolvers(namespace_resolver)
+    return count
+
+
+def warm_up():
+    """Warm the process up; returns what was loaded and how long it took"""
+    started = time.perf_counter()
+    with translation.override(settings.LANGUAGE_CODE):
+        # Loads the gettext catalogs of every installed app
+        translation.gettext('')
+        templates = warm_templates()
+    patterns = warm_resolvers()
+    # Nothing here should need the database, but a connection opened by the
+    # project's imports must not be inherited by the forked workers
+    connections.close_all()
+    return {
+        'templates': templates,
+        'url_patterns': patterns,
+        'seconds': time.perf_counter() - started,
+    }